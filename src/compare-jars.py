@@ -0,0 +1,221 @@
+# MIT License
+#
+# Copyright (c) 2024 Johann N. Loefflmann, https://johann.loefflmann.net
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Compares the performance of two Jacksum jars, e.g. the last release and a snapshot, by the testvectors of the
+# catalog. For every algorithm, a sample of its testvectors is hashed by both jars in every round, in a random
+# order, so that a drift of the machine affects both jars alike. The outputs of both jars must agree, and the
+# difference of the wall time per algorithm is reported with a bootstrap confidence interval. The exit status is 1
+# if the outputs differ or if an algorithm is slower by more than --threshold with confidence.
+
+import argparse
+import datetime
+import json
+import os
+import random
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from testvectors.lib import catalog
+from testvectors.lib import config
+from testvectors.lib import jacksum
+from testvectors.lib import loader
+
+DEFAULT_VECTORS = 32
+DEFAULT_ROUNDS = 10
+DEFAULT_THRESHOLD = 0.05
+BOOTSTRAP_SAMPLES = 2000
+# the confidence level of the intervals
+CONFIDENCE = 0.95
+# the slowest throughput in bytes/s that is expected, it determines the timeout of a call
+MIN_THROUGHPUT = 1 << 20
+
+
+def sample(testcases, count):
+    """Returns up to count testcases which are spread evenly over the testcases, so that short and long messages
+    are sampled alike."""
+    if len(testcases) <= count:
+        return testcases
+    return [testcases[i * (len(testcases) - 1) // (count - 1)] for i in range(count)] if count > 1 else testcases[:1]
+
+
+class Workload:
+    """The sampled testvectors of an algorithm. If they can be batched, they are hashed by a single call which reads
+    the messages from a file list, otherwise every testcase is a call of its own."""
+
+    def __init__(self, algo, testcases, directory):
+        self.algo = algo
+        self.testcases = testcases
+        self.length = sum(case.message_length() for case in testcases)
+        self.filelist = None
+        key = loader.batch_key(testcases[0])
+        if key is not None and all(loader.batch_key(case) == key for case in testcases):
+            os.makedirs(directory)
+            self.filenames = []
+            for i, case in enumerate(testcases):
+                filename = os.path.join(directory, f"{i}.bin")
+                with open(filename, 'wb') as f:
+                    f.write(bytes.fromhex(case.args[3][len('hex:'):]))
+                self.filenames.append(filename)
+            self.filelist = os.path.join(directory, 'filelist.txt')
+            with open(self.filelist, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(self.filenames) + '\n')
+
+    def run(self, backend):
+        """Performs the workload by backend and returns the wall time in seconds and the outputs of the testcases."""
+        timeout = jacksum.CALIBRATION_TIMEOUT + self.length / MIN_THROUGHPUT
+        if self.filelist is not None:
+            _, encoding = loader.batch_key(self.testcases[0])
+            stdout, stderr, status, usage = backend.execute(["-a", self.algo, "-E", encoding,
+                                                             "-F", "#CHECKSUM #FILENAME", "-L", self.filelist],
+                                                            timeout)
+            digests = {}
+            for line in stdout.splitlines():
+                digest, _, filename = line.partition(' ')
+                digests[filename] = digest
+            return usage.wall, [digests.get(filename) for filename in self.filenames]
+        wall = 0.0
+        outputs = []
+        for case in self.testcases:
+            stdout, stderr, status, usage = backend.execute(case.args, timeout)
+            wall += usage.wall
+            outputs.append(stdout.strip())
+        return wall, outputs
+
+
+def bootstrap(a, b, rng, samples=BOOTSTRAP_SAMPLES):
+    """Returns the relative difference of the mean of b to the mean of a, and its confidence interval by the
+    bootstrap of the paired rounds."""
+    def delta(indexes):
+        return statistics.fmean(b[i] for i in indexes) / statistics.fmean(a[i] for i in indexes) - 1
+
+    n = len(a)
+    deltas = sorted(delta([rng.randrange(n) for _ in range(n)]) for _ in range(samples))
+    tail = (1 - CONFIDENCE) / 2
+    return delta(range(n)), deltas[int(tail * (samples - 1))], deltas[int((1 - tail) * (samples - 1))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares the performance of two Jacksum jars.')
+    parser.add_argument('jar_a', help='the baseline jar, e.g. jacksum-3.7.0.jar')
+    parser.add_argument('jar_b', help='the jar that is compared to the baseline, e.g. jacksum-3.8.0-SNAPSHOT.jar')
+    parser.add_argument('--where', default='1',
+                        help='compare the algorithms of the testcases in the catalog matching this SQL expression '
+                             '(default: all)')
+    parser.add_argument('--catalog', default=catalog.CATALOG,
+                        help=f'catalog the testcases are taken from (default: {catalog.CATALOG})')
+    parser.add_argument('--vectors', type=int, default=DEFAULT_VECTORS,
+                        help=f'number of testvectors per algorithm (default: {DEFAULT_VECTORS})')
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS,
+                        help=f'number of rounds, every round performs every algorithm by both jars '
+                             f'(default: {DEFAULT_ROUNDS})')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'an algorithm is a regression if jar_b is slower by more than this fraction with '
+                             f'{CONFIDENCE:.0%} confidence (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the order of the jars and of the bootstrap (default: 0)')
+    parser.add_argument('-o', '--output', default='comparison.json',
+                        help='json file the results are written to (default: comparison.json)')
+    options = parser.parse_args()
+    if options.vectors < 1 or options.rounds < 2:
+        parser.error('--vectors must be at least 1 and --rounds at least 2')
+    for jar in (options.jar_a, options.jar_b):
+        if not os.path.exists(jar):
+            parser.error(f"{jar} not found")
+    if not os.path.exists(options.catalog):
+        parser.error(f"{options.catalog} not found, run convert-testvectors-text2json.py to create it")
+
+    apps = {'a': config.APP[:-1] + [options.jar_a], 'b': config.APP[:-1] + [options.jar_b]}
+    backends = {jar: jacksum.SubprocessBackend(app) for jar, app in apps.items()}
+    rng = random.Random(options.seed)
+    testcases = {}
+    for case in loader.read_catalog(options.catalog, options.where, config.TEST_ALGOS + config.GENERATED_ALGOS):
+        testcases.setdefault(loader.algorithm(case) or case.source, []).append(case)
+
+    report = {
+        'jar_a': options.jar_a,
+        'jar_b': options.jar_b,
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'rounds': options.rounds,
+        'threshold': options.threshold,
+        'results': []
+    }
+    mismatches = 0
+    regressions = 0
+    try:
+        with tempfile.TemporaryDirectory(prefix='jacksum-compare-', dir=jacksum.MESSAGE_DIR) as directory:
+            workloads = [Workload(algo, sample(cases, options.vectors), os.path.join(directory, str(i)))
+                         for i, (algo, cases) in enumerate(testcases.items())]
+            print(f"{len(workloads)} algorithms, {options.rounds} rounds, "
+                  f"{shlex.join(apps['a'])} vs. {shlex.join(apps['b'])}\n")
+            for workload in workloads:
+                walls = {'a': [], 'b': []}
+                outputs = {}
+                # the first round warms up the page cache and is not counted
+                for round in range(options.rounds + 1):
+                    for jar in rng.sample(['a', 'b'], 2):
+                        wall, outputs[jar] = workload.run(backends[jar])
+                        if round > 0:
+                            walls[jar].append(wall)
+                disagree = [case.id for case, a, b in zip(workload.testcases, outputs['a'], outputs['b']) if a != b]
+                delta, low, high = bootstrap(walls['a'], walls['b'], rng)
+                regression = low > options.threshold
+                mismatches += len(disagree)
+                regressions += regression
+                report['results'].append({
+                    'algo': workload.algo,
+                    'vectors': len(workload.testcases),
+                    'bytes': workload.length,
+                    'wall_a_s': statistics.fmean(walls['a']),
+                    'wall_b_s': statistics.fmean(walls['b']),
+                    'delta': delta,
+                    'delta_ci': [low, high],
+                    'significant': low > 0 or high < 0,
+                    'regression': regression,
+                    'disagree': disagree
+                })
+                verdict = 'REGRESSION' if regression else ('significant' if low > 0 or high < 0 else '')
+                print(f"{workload.algo:<40} {statistics.fmean(walls['a']):8.3f}s {statistics.fmean(walls['b']):8.3f}s "
+                      f"{delta:+7.1%} [{low:+7.1%}, {high:+7.1%}] {verdict}"
+                      + (f" outputs differ: {', '.join(disagree)}" if disagree else ''), flush=True)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        print(f"Comparison aborted: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print(f"Interrupted.")
+        sys.exit(130)
+    finally:
+        print(f"Writing {options.output} ...")
+        with open(options.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    print(f"\n{regressions} regression{'' if regressions == 1 else 's'}, "
+          f"{mismatches} testvector{'' if mismatches == 1 else 's'} with different outputs")
+    if regressions or mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
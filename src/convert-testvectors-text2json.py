@@ -22,8 +22,18 @@
 
 # Converts NIST .rsp files or text files stored in CAVS format to json.
 
+import argparse
+import contextlib
 import json
+import os
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from testvectors.lib import catalog
+from testvectors.lib import compression
+from testvectors.lib import loader
+from testvectors.lib import manifest
 
 ERROR = 'ERROR'
 WARNING = 'WARNING'
@@ -170,6 +180,17 @@ testvectors_in_textfiles = [
     {'algo': 'romulus-h', 'dir': RAW_DIR + 'romulus-h', 'files': NIST_LWC_COMPETITION_2023}
 ]
 
+# testvectors which are not converted from text files, but which are added to the catalog
+testvectors_in_json = [
+    ('crc-catalogue', 'crc'),
+    ('crc64-jones', 'crc')
+]
+
+# testvectors which are generated, e.g. by generate-crc-testvectors.py, they are added to the catalog if they exist
+generated_testvectors_in_json = [
+    ('crc-generated', 'crc')
+]
+
 MSG_LEN_PREFIX = "Len ="  # followed by the length of the message in bits, optional
 MSG_PREFIX = "Msg ="  # followed by the message in hex lowercase encoding, required
 MD_LEN_PREFIX = "[L ="  # followed by the length of the MD in bits, optional
@@ -189,26 +210,22 @@ def is_hex_uppercase(s):
     return all(c in HEXDIGITS_UPPERCASE for c in s)
 
 
-def testvectors_text2json(record):
-    algorithm = record['algo']
-    directory = record['dir']
-    filenames = record['files']
+def read_lines(path):
+    """Yields the lines of a file."""
+    print(f"Reading {path} ...", flush=True)
+    with compression.open_text(path) as file:
+        yield from file
 
-    lines = []
-    for filename in filenames:
-        path = f"{directory}/{filename}"
-        print(f"Reading {path} ...")
-        file = open(path, 'r', encoding='utf-8')
-        lines.extend(file.readlines())
-        file.close()
 
+def parse_testvectors(path):
+    """Reads a text file and yields its testvectors one by one as tuples
+    (message length in bits, message, message digest, encoding of the message digest)."""
     md_length_in_bits = 0
     expected_next = MD_LEN_PREFIX
-    testcases = []
     ignore_next_md = False
     msg_length_is_a_property = False
 
-    for line in lines:
+    for line in read_lines(path):
 
         if line.strip() and not line.startswith("#"):  # ignore empty and commented lines
             line = line.strip()
@@ -268,16 +285,7 @@ def testvectors_text2json(record):
                         hex_encoding = "hex-uppercase"
                     else:
                         print(f"{ERROR}: unexpected encoding in digest {md}")
-                    obj = {
-                        'desc': f"Algo = {algorithm}, MDLen = {md_length_in_bits}, MsgLen = {msg_length_in_bits}",
-                        'args': ["-a", f"{algorithm}",
-                                 "-q", f"hex:{msg}",
-                                 "-E", f"{hex_encoding}"
-                                 ],
-                        # 'msg': f"{msg}",
-                        'expected': md
-                    }
-                    testcases.append(obj)
+                    yield msg_length_in_bits, msg, md, hex_encoding
                 else:
                     pass
                     # print(f"{WARNING}: ignoring the MD, because the message length is not a multiple of 8 bits.",
@@ -292,16 +300,177 @@ def testvectors_text2json(record):
     if expected_next != MSG_LEN_PREFIX:
         print(f"{ERROR}: Last record is incomplete, {expected_next} was expected.")
 
-    return json.dumps(testcases, indent=2)
+
+def to_json(algorithm, testvector):
+    """Returns the json representation of a testvector for an algorithm."""
+    msg_length_in_bits, msg, md, hex_encoding = testvector
+    return {
+        'desc': f"Algo = {algorithm}, MDLen = {len(md) * 4}, MsgLen = {msg_length_in_bits}",
+        'args': ["-a", f"{algorithm}",
+                 "-q", f"hex:{msg}",
+                 "-E", f"{hex_encoding}"
+                 ],
+        # 'msg': f"{msg}",
+        'expected': md
+    }
+
+
+class JsonArrayWriter:
+    """Writes a json array element by element, the output is the same as json.dumps(elements, indent=2)."""
+
+    def __init__(self, filename):
+        self.file = compression.open_text(filename, 'w')
+        self.empty = True
+
+    def write(self, element):
+        self.file.write('[\n  ' if self.empty else ',\n  ')
+        self.file.write(json.dumps(element, indent=2).replace('\n', '\n  '))
+        self.empty = False
+
+    def close(self):
+        self.file.write('[]' if self.empty else '\n]')
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def convert(textfiles, filenames, catalog_filename):
+    """Converts the text files of records to their json files given by filenames (algo -> json file) and writes
+    their testcases to the catalog catalog_filename. The records must have text files with the same names and
+    content, e.g. the same KAT files of different variants of an algorithm, so that the text files are parsed
+    only once for all of them."""
+    connection = catalog.create(catalog_filename)
+    with contextlib.ExitStack() as stack:
+        writers = []
+        for textfile in textfiles:
+            filename = filenames[textfile['algo']]
+            # other formats of the json file would be found instead of this one
+            for variant in compression.variants(compression.basename(filename)):
+                if variant != filename and os.path.exists(variant):
+                    os.remove(variant)
+            print(f"Writing {filename} ...", flush=True)
+            writers.append((textfile, stack.enter_context(JsonArrayWriter(filename))))
+
+        def rows():
+            ordinal = 0
+            for source in textfiles[0]['files']:
+                position = 0
+                for testvector in parse_testvectors(compression.find(f"{textfiles[0]['dir']}/{source}")):
+                    ordinal += 1
+                    position += 1
+                    for textfile, writer in writers:
+                        testcase = to_json(textfile['algo'], testvector)
+                        writer.write(testcase)
+                        yield catalog.row(textfile['algo'], os.path.basename(textfile['dir']), source, ordinal,
+                                          position, testcase['desc'], testcase['args'], testcase['expected'])
+
+        catalog.insert(connection, rows())
+    connection.commit()
+    connection.close()
 
 
 def main():
+    parser = argparse.ArgumentParser(description='Converts the text based testvectors to json and writes the catalog.')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='number of processes that convert testvectors in parallel (default: number of CPUs)')
+    parser.add_argument('--compress', choices=['none', 'gzip', 'bz2', 'xz', 'auto'], default='none',
+                        help='compress the json files, auto compresses large files by xz and small ones by gzip '
+                             '(default: none)')
+    parser.add_argument('--force', action='store_true',
+                        help='convert all testvectors, even if their inputs have not changed since the last run')
+    options = parser.parse_args()
+    if options.jobs < 1:
+        parser.error('--jobs must be at least 1')
+
+    # the outputs depend on the converter and on the libraries which write the json files and the catalog
+    converter_version = manifest.version(__file__, catalog.__file__, compression.__file__, loader.__file__)
+    current = manifest.Manifest()
+
+    # algo -> (json file, manifest record of the json file)
+    outputs = {}
     for textfile in testvectors_in_textfiles:
-        with open(f"testvectors/json/{textfile['algo']}.json", 'w', encoding='utf-8') as f:
-            json_data = testvectors_text2json(textfile)
-            print(f"Writing {f.name} ...")
-            f.write(json_data)
-            f.close()
+        inputs = [compression.find(f"{textfile['dir']}/{name}") for name in textfile['files']]
+        codec = compression.choose(options.compress, sum(os.path.getsize(path) for path in inputs))
+        filename = compression.filename(f"testvectors/json/{textfile['algo']}.json", codec)
+        outputs[textfile['algo']] = filename, current.output(textfile['algo'], inputs, filename)
+    # testvectors which are available in json only, they are an input of the catalog only
+    json_only = testvectors_in_json + [(algo, family) for algo, family in generated_testvectors_in_json
+                                       if os.path.exists(compression.find(f"testvectors/json/{algo}.json"))]
+    for algo, family in json_only:
+        filename = compression.find(f"testvectors/json/{algo}.json")
+        outputs[algo] = filename, current.output(algo, [filename], None)
+
+    # the rows of an algo are copied from the previous catalog if nothing has changed
+    catalog_is_up_to_date = (not options.force and current.previous.get('catalog') is not None
+                             and current.previous['catalog'] == current.digest(catalog.CATALOG))
+    up_to_date = {algo for algo, (_, record) in outputs.items()
+                  if catalog_is_up_to_date and current.is_up_to_date(converter_version, algo, record)}
+    # the catalog is written again if an output has been removed, e.g. generated testvectors
+    if len(up_to_date) == len(outputs) and set(current.previous.get('outputs', {})) == set(outputs):
+        print(f"Nothing to do, {catalog.CATALOG} and all {len(outputs)} outputs are up to date.")
+        return
+
+    # records whose text files have the same names and content are converted together, and
+    # every group is converted by a process of its own to a json file and a catalog of its own
+    groups = {}
+    for textfile in testvectors_in_textfiles:
+        if textfile['algo'] not in up_to_date:
+            _, record = outputs[textfile['algo']]
+            key = tuple(zip(textfile['files'], record['inputs'].values()))
+            groups.setdefault(key, []).append(textfile)
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(catalog.CATALOG)) as tmp:
+        converted = {}
+        with ProcessPoolExecutor(max_workers=options.jobs) as executor:
+            futures = []
+            for number, textfiles in enumerate(groups.values()):
+                group_catalog = f"{tmp}/{number}.sqlite"
+                filenames = {textfile['algo']: outputs[textfile['algo']][0] for textfile in textfiles}
+                futures.append(executor.submit(convert, textfiles, filenames, group_catalog))
+                converted.update((textfile['algo'], group_catalog) for textfile in textfiles)
+            for future in futures:
+                future.result()
+
+        # the catalog is written to a temporary file first, so that readers never see an incomplete catalog
+        catalog_tmp = f"{catalog.CATALOG}.tmp"
+        connection = catalog.create(catalog_tmp)
+
+        for textfile in testvectors_in_textfiles:
+            algo = textfile['algo']
+            filename, record = outputs[algo]
+            if algo in up_to_date:
+                print(f"Skipping {filename}, it is up to date.")
+                catalog.copy(connection, catalog.CATALOG, algo)
+            else:
+                catalog.copy(connection, converted[algo], algo)
+                outputs[algo] = filename, current.output(algo, record['inputs'], filename)
+
+        for algo, family in json_only:
+            filename, _ = outputs[algo]
+            if algo in up_to_date:
+                print(f"Skipping {filename}, it is up to date.")
+                catalog.copy(connection, catalog.CATALOG, algo)
+            else:
+                print(f"Reading {filename} ...")
+                with compression.open_text(filename) as f:
+                    catalog.insert(connection, (catalog.row(algo, family, f"{algo}.json", ordinal, ordinal,
+                                                            testcase['desc'], testcase['args'], testcase['expected'])
+                                                for ordinal, testcase in enumerate(loader.iter_json_array(f), 1)))
+
+        print(f"Writing {catalog.CATALOG} ...")
+        connection.commit()
+        connection.execute("VACUUM")
+        connection.close()
+        os.replace(catalog_tmp, catalog.CATALOG)
+
+    print(f"Writing {manifest.MANIFEST} ...")
+    current.write(converter_version, {algo: record for algo, (_, record) in outputs.items()},
+                  current.digest(catalog.CATALOG))
 
 
-main()
+if __name__ == '__main__':
+    main()
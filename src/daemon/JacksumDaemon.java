@@ -0,0 +1,153 @@
+/*
+ * MIT License
+ *
+ * Copyright (c) 2023-2024 Johann N. Loefflmann, https://johann.loefflmann.net
+ *
+ * Permission is hereby granted, free of charge, to any person obtaining a copy
+ * of this software and associated documentation files (the "Software"), to deal
+ * in the Software without restriction, including without limitation the rights
+ * to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+ * copies of the Software, and to permit persons to whom the Software is
+ * furnished to do so, subject to the following conditions:
+ *
+ * The above copyright notice and this permission notice shall be included in all
+ * copies or substantial portions of the Software.
+ *
+ * THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+ * IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+ * FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+ * AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+ * LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+ * OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+ * SOFTWARE.
+ */
+
+import java.io.BufferedInputStream;
+import java.io.BufferedOutputStream;
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.DataInputStream;
+import java.io.DataOutputStream;
+import java.io.EOFException;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.nio.charset.StandardCharsets;
+import java.security.Permission;
+import java.util.jar.JarFile;
+
+/**
+ * Loads Jacksum once and calls its main method for every request read from stdin,
+ * so that the JVM startup, class loading and JIT warmup is paid only once.
+ * <p>
+ * Usage: java -Djava.security.manager=allow -cp jacksum.jar daemon/JacksumDaemon.java jacksum.jar
+ * <p>
+ * System.exit() of Jacksum is trapped by a security manager, so the daemon runs on JDK 11 to 23 only:
+ * JDK 12 to 23 require -Djava.security.manager=allow, JDK 11 must be started without it, and JDK 24 and later
+ * don't support a security manager anymore (JEP 486).
+ * <p>
+ * Protocol, all integers are 32 bit big endian:
+ * <pre>
+ * request:  int argc, followed by argc times: int length, UTF-8 bytes of the argument
+ *           argc == -1 is a ping which is answered by an empty response
+ * response: int exit status, int length, bytes of stdout, int length, bytes of stderr
+ * </pre>
+ * The daemon terminates at the end of stdin.
+ */
+public class JacksumDaemon {
+
+    private static final int PING = -1;
+
+    /** Thrown instead of terminating the JVM if Jacksum calls System.exit(). */
+    private static class ExitException extends SecurityException {
+        private final int status;
+
+        ExitException(int status) {
+            this.status = status;
+        }
+    }
+
+    public static void main(String[] args) throws Exception {
+        String mainClassName;
+        try (JarFile jar = new JarFile(args[0])) {
+            mainClassName = jar.getManifest().getMainAttributes().getValue("Main-Class");
+        }
+        Method jacksum = Class.forName(mainClassName).getMethod("main", String[].class);
+
+        // the protocol uses the original stdout, Jacksum writes to System.out which is redirected per request
+        DataInputStream in = new DataInputStream(new BufferedInputStream(System.in));
+        DataOutputStream out = new DataOutputStream(new BufferedOutputStream(new FileOutputStream(FileDescriptor.out)));
+
+        try {
+            System.setSecurityManager(new SecurityManager() {
+                @Override
+                public void checkExit(int status) {
+                    throw new ExitException(status);
+                }
+
+                @Override
+                public void checkPermission(Permission perm) {
+                    // everything else is permitted
+                }
+            });
+        } catch (UnsupportedOperationException e) {
+            System.err.println("JacksumDaemon: a security manager can't be installed on this JDK, JDK 11 to 23 is "
+                    + "required, and JDK 12 to 23 must be started with -Djava.security.manager=allow");
+            System.exit(2);
+        }
+
+        while (true) {
+            int argc;
+            try {
+                argc = in.readInt();
+            } catch (EOFException e) {
+                break;
+            }
+            if (argc == PING) {
+                respond(out, 0, new byte[0], new byte[0]);
+                continue;
+            }
+            String[] jacksumArgs = new String[argc];
+            for (int i = 0; i < argc; i++) {
+                byte[] arg = new byte[in.readInt()];
+                in.readFully(arg);
+                jacksumArgs[i] = new String(arg, StandardCharsets.UTF_8);
+            }
+
+            ByteArrayOutputStream stdout = new ByteArrayOutputStream();
+            ByteArrayOutputStream stderr = new ByteArrayOutputStream();
+            PrintStream printOut = new PrintStream(stdout, true, "UTF-8");
+            PrintStream printErr = new PrintStream(stderr, true, "UTF-8");
+            System.setOut(printOut);
+            System.setErr(printErr);
+            System.setIn(new ByteArrayInputStream(new byte[0]));
+            int status = 0;
+            try {
+                jacksum.invoke(null, (Object) jacksumArgs);
+            } catch (InvocationTargetException e) {
+                Throwable cause = e.getCause();
+                if (cause instanceof ExitException) {
+                    status = ((ExitException) cause).status;
+                } else {
+                    cause.printStackTrace(printErr);
+                    status = 1;
+                }
+            }
+            printOut.flush();
+            printErr.flush();
+            respond(out, status, stdout.toByteArray(), stderr.toByteArray());
+        }
+    }
+
+    private static void respond(DataOutputStream out, int status, byte[] stdout, byte[] stderr) throws IOException {
+        out.writeInt(status);
+        out.writeInt(stdout.length);
+        out.write(stdout);
+        out.writeInt(stderr.length);
+        out.write(stderr);
+        out.flush();
+    }
+}
@@ -0,0 +1,127 @@
+# MIT License
+#
+# Copyright (c) 2024 Johann N. Loefflmann, https://johann.loefflmann.net
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Generates testvectors for all CRC models of testvectors/json/crc-catalogue.json (see parse-crc-catalogue.py),
+# which tests every model by its check value only. The CRCs are computed by the table driven engine of
+# testvectors/lib/crc.py, which is verified against the check value and the residue of the catalogue first.
+# For every model, the messages are the prefixes of pseudo random byte strings, so that the CRCs of all
+# lengths from 0 to --max-length are computed in a single pass over each string.
+# The testvectors are written to testvectors/json/crc-generated.json, which is tested by run-tests.py and added
+# to the catalog by convert-testvectors-text2json.py if it exists.
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+from testvectors.lib import compression
+from testvectors.lib import crc
+from testvectors.lib import loader
+
+CATALOGUE_JSON = 'testvectors/json/crc-catalogue.json'
+GENERATED_JSON = 'testvectors/json/crc-generated.json'
+
+DEFAULT_MAX_LENGTH = 256
+DEFAULT_MESSAGES = 8
+
+# lengths of the messages by which the table of a model is verified against the reference
+VERIFY_LENGTHS = (1, 2, 3, 7, 8, 9, 31, 64)
+
+
+def read_models(filename):
+    """Yields the Jacksum algorithm and the Model of every testcase of the catalogue."""
+    with compression.open_text(filename) as f:
+        for testcase in loader.iter_json_array(f):
+            yield testcase['args'][1], crc.Model.parse(testcase['desc'])
+
+
+def generate(algo, model, messages):
+    """Yields the testcases of a model for all prefixes of the messages, the empty message only once."""
+    for number, message in enumerate(messages, 1):
+        for length, value in enumerate(model.prefixes(message)):
+            if length == 0 and number > 1:
+                continue
+            yield {
+                'desc': f"{model.name}, Msg = #{number}, Len = {length}",
+                'args': ["-a", algo, "-q", f"hex:{message[:length].hex()}", "-E", "hex", "-F", "#CHECKSUM"],
+                'expected': model.hex(value)
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generates testvectors for all CRC models of the catalogue.')
+    parser.add_argument('--max-length', type=int, default=DEFAULT_MAX_LENGTH,
+                        help=f'max. length of the messages in bytes, all lengths from 0 are generated '
+                             f'(default: {DEFAULT_MAX_LENGTH})')
+    parser.add_argument('--messages', type=int, default=DEFAULT_MESSAGES,
+                        help=f'number of pseudo random messages per length (default: {DEFAULT_MESSAGES})')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the pseudo random messages (default: 0)')
+    parser.add_argument('--compress', choices=['none'] + list(compression.CODECS), default='none',
+                        help='write the json file compressed (default: none)')
+    parser.add_argument('-o', '--output', default=GENERATED_JSON,
+                        help=f'json file the testvectors are written to (default: {GENERATED_JSON})')
+    options = parser.parse_args()
+    if options.max_length < 0 or options.messages < 1:
+        parser.error('--max-length must not be negative and --messages must be at least 1')
+
+    start = time.monotonic()
+    rng = random.Random(options.seed)
+    messages = [rng.randbytes(options.max_length) for _ in range(options.messages)]
+    samples = [rng.randbytes(length) for length in VERIFY_LENGTHS]
+
+    print(f"Reading {CATALOGUE_JSON} ...")
+    models = []
+    skipped = 0
+    for algo, model in read_models(CATALOGUE_JSON):
+        try:
+            model.verify(samples)
+            models.append((algo, model))
+        except ValueError as e:
+            print(f"Skipping {algo}: {e}", file=sys.stderr)
+            skipped += 1
+
+    filename = compression.filename(options.output, options.compress)
+    for variant in compression.variants(options.output):
+        if variant != filename and os.path.exists(variant):
+            os.remove(variant)
+    print(f"Writing {filename} ...")
+    count = 0
+    with compression.open_text(filename, 'w') as f:
+        f.write('[')
+        for algo, model in models:
+            for testcase in generate(algo, model, messages):
+                f.write(',\n' if count else '\n')
+                f.write(json.dumps(testcase))
+                count += 1
+        f.write('\n]\n')
+
+    print(f"{count} testvectors of {len(models)} CRC models in {time.monotonic() - start:.1f}s")
+    if skipped:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
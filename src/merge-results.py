@@ -0,0 +1,126 @@
+# MIT License
+#
+# Copyright (c) 2024 Johann N. Loefflmann, https://johann.loefflmann.net
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Merges the results of the shards of a run of run-tests.py, which have been written by --jsonl, e.g.
+#   python ./run-tests.py --shard 1/2 --jsonl shard-1.jsonl
+#   python ./run-tests.py --shard 2/2 --jsonl shard-2.jsonl
+#   python ./merge-results.py shard-1.jsonl shard-2.jsonl
+# and prints the statistics of the whole run. The exit status is 1 if a testcase has not passed or is missing.
+# Every file starts with its shard, and it ends with the number of testcases of the whole run if the shard has
+# performed all its testcases, by which shards and testcases which are missing are detected.
+
+import argparse
+import json
+import sys
+
+from testvectors.lib import compression
+from testvectors.lib import reporting
+
+
+def read_results(filenames):
+    """Returns the id and the verdict of every testcase by its number, and the shard and the number of testcases
+    of the whole run of every file by its name, each of them None if the file doesn't tell. If a testcase is in
+    more than one file, e.g. because a shard has been run again, the result of the last file is taken."""
+    verdicts = {}
+    summaries = {}
+    for filename in filenames:
+        shard = total = None
+        with compression.open_text(filename) as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    if 'test' in record:
+                        verdicts[record['test']] = record['id'], record['verdict']
+                    elif 'shard' in record:
+                        shard = tuple(record['shard'] or (1, 1))
+                    else:
+                        total = record['total']
+                except (ValueError, KeyError, TypeError) as e:
+                    raise ValueError(f"{filename}:{line_number}: not a result of run-tests.py --jsonl: {e}")
+        summaries[filename] = shard, total
+    return verdicts, summaries
+
+
+def check_complete(verdicts, summaries):
+    """Prints the shards which are missing or have not been completed by any file, and the testcases which are
+    missing. Returns the number of testcases missing and whether all shards are complete.
+    Raises ValueError if the files are of different runs."""
+    totals = {total for _, total in summaries.values() if total is not None}
+    counts = {shard[1] for shard, _ in summaries.values() if shard is not None}
+    if len(totals) > 1 or len(counts) > 1:
+        raise ValueError("the files are of different runs, they have different numbers of testcases or shards")
+    complete = True
+    for shard in sorted({shard for shard, _ in summaries.values() if shard is not None}):
+        if all(total is None for other, total in summaries.values() if other == shard):
+            print(f"shard {shard[0]}/{shard[1]} is incomplete, it has been interrupted or stopped by --fail-fast")
+            complete = False
+    if counts:
+        count = counts.pop()
+        for index in sorted(set(range(1, count + 1)) - {shard[0] for shard, _ in summaries.values() if shard}):
+            print(f"shard {index}/{count} is missing")
+            complete = False
+    # without the number of testcases of the whole run, testcases after the last one that has been reported
+    # can't be told missing
+    missing = (totals.pop() if totals else max(verdicts, default=0)) - len(verdicts)
+    if missing > 0:
+        print(f"{missing} testcase{'' if missing == 1 else 's'} missing")
+    return max(missing, 0), complete
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Merges the results of the shards of a run of run-tests.py.')
+    parser.add_argument('files', nargs='+',
+                        help='results of the shards written by run-tests.py --jsonl, a shard which has been run '
+                             'again replaces the results of the files before it')
+    parser.add_argument('--allow-gaps', action='store_true',
+                        help='don\'t fail if testcases are missing, e.g. in a smoke test by --budget')
+    options = parser.parse_args()
+    try:
+        verdicts, summaries = read_results(options.files)
+        missing, complete = check_complete(verdicts, summaries)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    statistics = {
+        "passed": 0,
+        "failed": [],
+        "timeouts": []
+    }
+    for number in sorted(verdicts):
+        id, verdict = verdicts[number]
+        if verdict.startswith('PASSED'):
+            statistics['passed'] += 1
+        elif verdict == 'TIMEOUT':
+            statistics['timeouts'].append(id)
+        else:
+            statistics['failed'].append(id)
+
+    reporting.print_summary(statistics, missing)
+    if statistics['failed'] or statistics['timeouts'] or ((missing > 0 or not complete) and not options.allow_gaps) or not verdicts:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -24,16 +24,28 @@
 # gets all crc definitions, and creates:
 # - crc-catalogue.json: a json, containing testcases for Jacksum
 # - on stdout: crc definitions for Jacksum's feature to find algorithms
-
-import requests
-import re
-import os
+#
+# The page is kept in ~/.cache/jacksum-testcases/crc-catalogue/ and it is only downloaded again if it has been
+# changed on the server (revalidated by ETag and Last-Modified). If the server can't be reached, the cached page
+# is used. crc-catalogue.json is only written again if the page has changed since it has been written, the crc
+# definitions are printed on stdout in any case.
+# --offline uses the cached page only, --from-file reads the page from a file.
+
+import argparse
+import hashlib
 import json
+import os
+import re
+import sys
+import urllib.error
+import urllib.request
 
 # Constants
 DATABASE_REMOTE = 'https://reveng.sourceforge.io/crc-catalogue/all.htm'
-DATABASE_LOCAL = "./crc-catalogue.html"
 TESTCASES_JSON = "./testvectors/json/crc-catalogue.json"
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'jacksum-testcases',
+                         'crc-catalogue')
+DOWNLOAD_TIMEOUT = 60
 
 # Regex definitions
 REGEXHEX  = r'0[xX]([0-9a-fA-F]+)'     # Hex with 0x/0X-Prefix
@@ -59,17 +71,67 @@ CRC_ORIGINAL_PATTERN = re.compile(r'''
     </CODE>
 ''', re.VERBOSE | re.IGNORECASE)
 
-# Download html database
-print(f"Downloading {DATABASE_REMOTE} ...")
-response = requests.get(DATABASE_REMOTE, allow_redirects=True)
-with open(DATABASE_LOCAL, 'wb') as f:
-    f.write(response.content)
 
-# Read lines
-print(f"Reading {DATABASE_LOCAL} ...")
-with open(DATABASE_LOCAL, 'r', encoding='utf-8') as f:
-    lines = f.readlines()
-    f.close()
+class PageCache:
+    """The page in the cache directory, with the ETag and Last-Modified of the server and the digest of the page
+    from which TESTCASES_JSON has been written."""
+
+    def __init__(self, directory=CACHE_DIR):
+        self.page = os.path.join(directory, 'all.htm')
+        self.meta = os.path.join(directory, 'meta.json')
+        try:
+            with open(self.meta, encoding='utf-8') as f:
+                self.info = json.load(f)
+        except (OSError, ValueError):
+            self.info = {}
+        if not os.path.exists(self.page):
+            self.info = {}
+
+    def read(self):
+        with open(self.page, 'rb') as f:
+            return f.read()
+
+    def write(self, content=None, **info):
+        """Stores the page if content is given, and updates the info about it."""
+        os.makedirs(os.path.dirname(self.page), exist_ok=True)
+        if content is not None:
+            with open(f"{self.page}.tmp", 'wb') as f:
+                f.write(content)
+            os.replace(f"{self.page}.tmp", self.page)
+        self.info.update(info)
+        with open(f"{self.meta}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(self.info, f, indent=2)
+        os.replace(f"{self.meta}.tmp", self.meta)
+
+
+def download(url, cache):
+    """Returns the page at url, which is only downloaded if it has changed since it has been cached.
+    If the server can't be reached, the cached page is returned."""
+    request = urllib.request.Request(url)
+    if cache.info.get('url') == url:
+        if cache.info.get('etag'):
+            request.add_header('If-None-Match', cache.info['etag'])
+        if cache.info.get('last_modified'):
+            request.add_header('If-Modified-Since', cache.info['last_modified'])
+    print(f"Downloading {url} ...")
+    try:
+        with urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT) as response:
+            content = response.read()
+            cache.write(content, url=url, etag=response.headers.get('ETag'),
+                        last_modified=response.headers.get('Last-Modified'))
+            return content
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            print(f"Not modified, using {cache.page}")
+            return cache.read()
+        error = e
+    except (urllib.error.URLError, OSError) as e:
+        error = e
+    if cache.info.get('url') != url:
+        raise OSError(f"Can't download {url}: {error}")
+    print(f"Can't download {url} ({error}), using {cache.page}", file=sys.stderr)
+    return cache.read()
+
 
 # Helper function
 def parse_crc_line(line):
@@ -115,22 +177,59 @@ def parse_crc_line(line):
     }
 
 
-# Build testcases
-testcases = []
-for line in lines:
-    # Example line:
-    # <CODE>width=4  poly=0x3  init=0x0  refin=true  refout=true  xorout=0x0  check=0x7  residue=0x0  name="CRC-4/G-704"</CODE>
-    result = parse_crc_line(line)
-    if result:
-        testcases.append(result)
-        #print(f"{result['name']};{result['args'][1]}")
-
-# Write output
-print(f"Writing {TESTCASES_JSON} ...")
-with open(TESTCASES_JSON, 'w', encoding='utf-8') as f:
-    json.dump(testcases, f, indent=4)
-    f.close()
-
-# Cleanup
-print(f"Removing {DATABASE_LOCAL} ...")
-os.remove(DATABASE_LOCAL)
\ No newline at end of file
+def main():
+    parser = argparse.ArgumentParser(description='Creates the CRC testcases from the CRC catalogue.')
+    parser.add_argument('--url', default=DATABASE_REMOTE,
+                        help=f'url of the catalogue (default: {DATABASE_REMOTE})')
+    parser.add_argument('--offline', action='store_true',
+                        help='don\'t download the catalogue, use the cached one')
+    parser.add_argument('--from-file', metavar='FILE',
+                        help='read the catalogue from an html file instead of downloading it')
+    parser.add_argument('--cache', default=CACHE_DIR,
+                        help=f'directory of the cached catalogue (default: {CACHE_DIR})')
+    parser.add_argument('--force', action='store_true',
+                        help=f'write {TESTCASES_JSON} even if the catalogue has not changed')
+    options = parser.parse_args()
+
+    cache = PageCache(options.cache)
+    try:
+        if options.from_file:
+            print(f"Reading {options.from_file} ...")
+            with open(options.from_file, 'rb') as f:
+                content = f.read()
+        elif options.offline:
+            print(f"Reading {cache.page} ...")
+            content = cache.read()
+        else:
+            content = download(options.url, cache)
+    except OSError as e:
+        print(f"{e}", file=sys.stderr)
+        sys.exit(1)
+
+    # Build testcases, this prints the crc definitions on stdout even if the json is up to date
+    testcases = []
+    for line in content.decode('utf-8').splitlines():
+        # Example line:
+        # <CODE>width=4  poly=0x3  init=0x0  refin=true  refout=true  xorout=0x0  check=0x7  residue=0x0  name="CRC-4/G-704"</CODE>
+        result = parse_crc_line(line)
+        if result:
+            testcases.append(result)
+            #print(f"{result['name']};{result['args'][1]}")
+
+    digest = hashlib.sha256(content).hexdigest()
+    if not options.force and cache.info.get('generated') == digest and os.path.exists(TESTCASES_JSON):
+        print(f"Nothing to write, the catalogue has not changed since {TESTCASES_JSON} has been written.")
+        return
+
+    # Write output
+    print(f"Writing {TESTCASES_JSON} ...")
+    with open(TESTCASES_JSON, 'w', encoding='utf-8') as f:
+        json.dump(testcases, f, indent=4)
+    try:
+        cache.write(generated=digest)
+    except OSError as e:
+        print(f"{e}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+# MIT License
+#
+# Copyright (c) 2024 Johann N. Loefflmann, https://johann.loefflmann.net
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Measures the throughput of Jacksum for all algorithms that are tested by run-tests.py.
+# The algorithms are taken from the catalog and the HMAC testcases, the jar and the JVM are configured in
+# testvectors/lib/config.py.
+
+import argparse
+import datetime
+import fnmatch
+import json
+import math
+import os
+import platform
+import random
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from testvectors.lib import catalog
+from testvectors.lib import config
+from testvectors.lib import hmac_testcases
+from testvectors.lib import jacksum
+from testvectors.lib import loader
+from testvectors.lib import units
+
+# sizes of the synthetic messages, 1 KiB to 1 GiB
+DEFAULT_SIZES = '1K,16K,256K,4M,64M,1G'
+
+# every point is measured at least MIN_REPEATS times, and repeated until the 95% confidence interval of the
+# hashing time is within +/- PRECISION of its mean, at most MAX_REPEATS times or MAX_SECONDS_PER_POINT seconds
+MIN_REPEATS = 5
+MAX_REPEATS = 50
+PRECISION = 0.05
+MAX_SECONDS_PER_POINT = 120
+
+# the slowest throughput in bytes/s that is expected, it determines the timeout of a call
+MIN_THROUGHPUT = 1 << 20
+
+# args that select the message and the format of the output, the other args configure the algorithm
+MESSAGE_ARGS = ('-q', '-E', '-F')
+
+# two-sided 95% quantiles of Student's t-distribution by degrees of freedom, 1.96 above
+T_QUANTILES = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+               2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+               2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+# the backend that calls Jacksum, a DaemonBackend with --backend daemon
+backend = jacksum.SubprocessBackend(config.APP)
+
+
+def algorithm_args(args):
+    """Returns the args of a testcase without the args that select the message and the format of the output,
+    e.g. ['-a', 'hmac:sha224', '-k', 'hex:0b0b...'] for an HMAC testcase."""
+    args = list(args)
+    result = []
+    i = 0
+    while i < len(args):
+        if args[i] in MESSAGE_ARGS:
+            i += 2
+        else:
+            result.append(args[i])
+            i += 1
+    return result
+
+
+def algorithms(catalog_filename, pattern='*'):
+    """Yields the args of all algorithms of TEST_ALGOS in the catalog and of the HMAC testcases whose name matches
+    the glob pattern, in the order of the testcases. An algorithm that is tested with different keys is yielded
+    with the first one."""
+    seen = set()
+    testcases = [loader.read_catalog(catalog_filename, '1', config.TEST_ALGOS),
+                 loader.from_dicts(hmac_testcases.get(), 'hmac')]
+    for cases in testcases:
+        for case in cases:
+            args = algorithm_args(case.args)
+            if args[:1] != ['-a'] or len(args) < 2 or not fnmatch.fnmatch(args[1], pattern):
+                continue
+            if args[1] not in seen:
+                seen.add(args[1])
+                yield args
+
+
+class Messages:
+    """Synthetic messages of a given size, which are written to files once and shared by all algorithms."""
+
+    BLOCK_SIZE = 1 << 20
+
+    def __init__(self, directory, seed=0):
+        self.directory = directory
+        self.block = random.Random(seed).randbytes(self.BLOCK_SIZE)
+        self.files = {}
+
+    def file(self, size):
+        if size not in self.files:
+            filename = os.path.join(self.directory, f"message-{size}.bin")
+            with open(filename, 'wb') as f:
+                remaining = size
+                while remaining > 0:
+                    f.write(self.block[:min(remaining, self.BLOCK_SIZE)])
+                    remaining -= self.BLOCK_SIZE
+            self.files[size] = filename
+        return self.files[size]
+
+
+def elapsed(args, filename, size):
+    """Calls Jacksum to hash the file and returns the elapsed wall time in seconds."""
+    timeout = jacksum.CALIBRATION_TIMEOUT + size / MIN_THROUGHPUT
+    start = time.monotonic()
+    stdout, stderr, status, usage = backend.execute(args + ["-F", "#CHECKSUM", filename], timeout)
+    end = time.monotonic()
+    if status != 0:
+        raise RuntimeError(f"{shlex.join(args)} has failed with exit status {status}: {stderr.strip()}")
+    return end - start
+
+
+def confidence_interval(samples):
+    """Returns the mean of the samples and the half width of its 95% confidence interval."""
+    mean = statistics.fmean(samples)
+    if len(samples) < 2:
+        return mean, math.inf
+    t = T_QUANTILES[len(samples) - 2] if len(samples) - 2 < len(T_QUANTILES) else 1.96
+    return mean, t * statistics.stdev(samples) / math.sqrt(len(samples))
+
+
+def measure(args, messages, size):
+    """Measures the throughput of the algorithm given by args for messages of the size.
+    Every repetition times a call with the message and a call with an empty message, the difference is the time
+    to hash the message without the startup of the JVM. The calls are repeated until the confidence interval
+    of the difference is stable."""
+    empty = messages.file(0)
+    message = messages.file(size)
+    differences = []
+    startups = []
+    start = time.monotonic()
+    while True:
+        startup = elapsed(args, empty, 0)
+        differences.append(elapsed(args, message, size) - startup)
+        startups.append(startup)
+        mean, half_width = confidence_interval(differences)
+        stable = mean > 0 and half_width <= PRECISION * mean
+        if len(differences) >= MIN_REPEATS and (stable or len(differences) >= MAX_REPEATS
+                                                or time.monotonic() - start > MAX_SECONDS_PER_POINT):
+            break
+
+    def throughput(seconds):
+        return size / seconds / 1e6 if seconds > 0 else None
+
+    return {
+        'args': args,
+        'algo': args[1],
+        'size': size,
+        'repeats': len(differences),
+        'stable': stable,
+        'startup_s': statistics.fmean(startups),
+        'hashing_s': mean,
+        'hashing_ci95_s': half_width,
+        'throughput_mb_s': throughput(mean),
+        # the slower bound of the throughput is given by the upper bound of the hashing time
+        'throughput_ci95_mb_s': [throughput(mean + half_width), throughput(mean - half_width)]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the throughput of Jacksum for every algorithm.')
+    parser.add_argument('--algos', default='*',
+                        help='glob pattern of the algorithms to be measured, e.g. "sha3-*" (default: all)')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f'comma separated sizes of the messages (default: {DEFAULT_SIZES})')
+    parser.add_argument('--catalog', default=catalog.CATALOG,
+                        help=f'catalog the algorithms are taken from (default: {catalog.CATALOG})')
+    parser.add_argument('--dir',
+                        help='directory for the synthetic messages (default: a temporary directory)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the synthetic messages (default: 0)')
+    parser.add_argument('-o', '--output', default='benchmarks.json',
+                        help='json file the results are written to (default: benchmarks.json)')
+    parser.add_argument('--backend', choices=['subprocess', 'daemon'], default='subprocess',
+                        help='start a JVM per call of Jacksum (subprocess), or perform all calls by a long-lived JVM '
+                             '(daemon), see run-tests.py (default: subprocess)')
+    options = parser.parse_args()
+    try:
+        sizes = sorted({units.parse_size(size) for size in options.sizes.split(',')})
+    except ValueError:
+        parser.error(f"--sizes: invalid size in {options.sizes}")
+    if not os.path.exists(options.catalog):
+        parser.error(f"{options.catalog} not found, run convert-testvectors-text2json.py to create it")
+
+    global backend
+    if options.backend == 'daemon':
+        try:
+            backend = jacksum.DaemonBackend(jacksum.daemon_command(config.APP), backend)
+        except jacksum.DaemonError as e:
+            print(f"{e}, falling back to a JVM per call", file=sys.stderr)
+            options.backend = 'subprocess'
+
+    report = {
+        'app': config.APP,
+        'backend': options.backend,
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'results': []
+    }
+
+    try:
+        with tempfile.TemporaryDirectory(prefix='jacksum-benchmark-', dir=options.dir) as directory:
+            messages = Messages(directory, options.seed)
+            for args in algorithms(options.catalog, options.algos):
+                for size in sizes:
+                    result = measure(args, messages, size)
+                    report['results'].append(result)
+                    mb_s = result['throughput_mb_s']
+                    print(f"{args[1]:<40} {units.format_size(size):>6} "
+                          f"{'n/a' if mb_s is None else f'{mb_s:10.1f} MB/s'} "
+                          f"(n={result['repeats']}{'' if result['stable'] else ', not stable'})", flush=True)
+    except (RuntimeError, OSError, subprocess.TimeoutExpired) as e:
+        print(f"Benchmark aborted: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print(f"Interrupted.")
+        sys.exit(130)
+    finally:
+        backend.close()
+        print(f"Writing {options.output} ...")
+        with open(options.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
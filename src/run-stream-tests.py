@@ -0,0 +1,221 @@
+# MIT License
+#
+# Copyright (c) 2024 Johann N. Loefflmann, https://johann.loefflmann.net
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Tests how Jacksum hashes large inputs, which are streamed to Jacksum on stdin or through a named pipe (FIFO),
+# without ever being written to disk. The input is a deterministic pseudo random stream of any size (e.g. 4G),
+# the expected digest is computed in Python while the stream is written (hashlib for SHA-2, SHA-3 and BLAKE2,
+# zlib for CRC-32). Both the verdict and the sustained throughput of every algorithm are reported.
+# The jar and the JVM are configured in testvectors/lib/config.py.
+
+import argparse
+import errno
+import hashlib
+import os
+import random
+import shlex
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+from testvectors.lib import config
+from testvectors.lib import jacksum
+from testvectors.lib import units
+
+DEFAULT_SIZE = '4G'
+
+# the stream is written in chunks of CHUNK_SIZE bytes
+CHUNK_SIZE = 1 << 20
+
+# the slowest throughput in bytes/s that is expected, it determines the timeout of a call
+MIN_THROUGHPUT = 1 << 20
+
+
+class Crc32:
+    """CRC-32 by zlib with the interface of hashlib."""
+
+    def __init__(self):
+        self.crc = 0
+
+    def update(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+
+    def hexdigest(self):
+        return f"{self.crc:08x}"
+
+
+# Jacksum algorithm -> reference implementation
+REFERENCES = {
+    'sha-224': hashlib.sha224,
+    'sha-256': hashlib.sha256,
+    'sha-384': hashlib.sha384,
+    'sha-512': hashlib.sha512,
+    'sha3-224': hashlib.sha3_224,
+    'sha3-256': hashlib.sha3_256,
+    'sha3-384': hashlib.sha3_384,
+    'sha3-512': hashlib.sha3_512,
+    'blake2b-512': hashlib.blake2b,
+    'blake2s-256': hashlib.blake2s,
+    'crc32': Crc32
+}
+
+DEFAULT_ALGOS = 'sha-256,sha-512,sha3-256,blake2b-512,crc32'
+
+
+def stream(size, seed=0):
+    """Yields a deterministic pseudo random stream of size bytes in chunks of CHUNK_SIZE bytes. Every chunk is
+    a rotation of a random block, which starts with the number of the chunk, so that no two chunks are the same
+    and the stream is produced as fast as memory can be copied."""
+    block = random.Random(seed).randbytes(CHUNK_SIZE)
+    number = 0
+    while size > 0:
+        offset = (number * 0x9e3779b1) % CHUNK_SIZE
+        chunk = struct.pack('<Q', number) + block[offset + 8:] + block[:offset]
+        yield chunk[:size] if size < CHUNK_SIZE else chunk
+        size -= CHUNK_SIZE
+        number += 1
+
+
+def open_fifo(path, process):
+    """Opens the FIFO for writing as soon as Jacksum has opened it for reading. Returns None if Jacksum has
+    exited before, a blocking open would wait forever then."""
+    while process.poll() is None:
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            if e.errno != errno.ENXIO:
+                raise
+            time.sleep(0.01)
+            continue
+        os.set_blocking(fd, True)
+        return open(fd, 'wb')
+    return None
+
+
+def test(algo, size, seed, mode):
+    """Streams size bytes to Jacksum, which computes algo, and computes the expected digest at the same time.
+    Returns the actual and the expected digest, the elapsed wall time and the share of the wall time that has
+    been spent to produce the stream and to compute the expected digest."""
+    reference = REFERENCES[algo]()
+    with tempfile.TemporaryDirectory(prefix='jacksum-stream-') as directory:
+        if mode == 'fifo':
+            path = os.path.join(directory, 'stream')
+            os.mkfifo(path)
+        else:
+            path = '-'
+        start = time.monotonic()
+        process = subprocess.Popen(config.APP + ["-a", algo, "-E", "hex", "-F", "#CHECKSUM", path],
+                                   stdin=subprocess.PIPE if mode == 'stdin' else subprocess.DEVNULL,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # stdout and stderr are read by threads, so that Jacksum can't block while the stream is written
+        output = {}
+        readers = [threading.Thread(target=lambda name, pipe: output.__setitem__(name, pipe.read()),
+                                    args=(name, pipe)) for name, pipe in (('stdout', process.stdout),
+                                                                          ('stderr', process.stderr))]
+        for reader in readers:
+            reader.start()
+        busy = 0.0
+        sink = None
+        try:
+            sink = process.stdin if mode == 'stdin' else open_fifo(path, process)
+            produced = time.monotonic()
+            for chunk in stream(size, seed):
+                reference.update(chunk)
+                busy += time.monotonic() - produced
+                if sink is not None:
+                    sink.write(chunk)
+                produced = time.monotonic()
+        except BrokenPipeError:
+            pass
+        finally:
+            if sink is not None:
+                try:
+                    sink.close()
+                except BrokenPipeError:
+                    pass
+        try:
+            process.wait(timeout=jacksum.CALIBRATION_TIMEOUT + size / MIN_THROUGHPUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            raise
+        finally:
+            for reader in readers:
+                reader.join()
+        elapsed = time.monotonic() - start
+    actual = jacksum.decode(output['stdout']).strip()
+    if process.returncode != 0:
+        actual = f"exit status {process.returncode}: {jacksum.decode(output['stderr']).strip()}"
+    return actual, reference.hexdigest(), elapsed, busy / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tests Jacksum with large inputs which are streamed to Jacksum.')
+    parser.add_argument('--algos', default=DEFAULT_ALGOS,
+                        help=f'comma separated algorithms, supported are {", ".join(REFERENCES)} '
+                             f'(default: {DEFAULT_ALGOS})')
+    parser.add_argument('--size', default=DEFAULT_SIZE,
+                        help=f'size of the input, e.g. 512M or 4G (default: {DEFAULT_SIZE})')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the pseudo random input (default: 0)')
+    parser.add_argument('--input', choices=['stdin', 'fifo'], default='stdin',
+                        help='stream the input to stdin of Jacksum, or through a named pipe (default: stdin)')
+    options = parser.parse_args()
+    algos = options.algos.split(',')
+    for algo in algos:
+        if algo not in REFERENCES:
+            parser.error(f"--algos: {algo} is not supported, supported are {', '.join(REFERENCES)}")
+    try:
+        size = units.parse_size(options.size)
+    except ValueError:
+        parser.error(f"--size: invalid size {options.size}")
+    if options.input == 'fifo' and not hasattr(os, 'mkfifo'):
+        parser.error('--input fifo is not supported on this platform')
+
+    print(f"Streaming {units.format_size(size)} to {shlex.join(config.APP)} on {options.input}\n")
+    failed = []
+    for algo in algos:
+        try:
+            actual, expected, elapsed, busy = test(algo, size, options.seed, options.input)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            actual, expected, elapsed, busy = f"{e}", '', 0.0, 0.0
+        passed = actual == expected
+        if not passed:
+            failed.append(algo)
+        throughput = f"{size / elapsed / 1e6:8.1f} MB/s" if elapsed > 0 else "     n/a"
+        # if producing the stream takes most of the time, Jacksum may be faster than measured
+        note = ", limited by the stream" if busy > 0.9 else ""
+        print(f"{algo:<16} {throughput} in {elapsed:7.2f}s{note}  {'PASSED' if passed else 'FAILED'}")
+        if not passed:
+            print(f"  actual:   {actual}\n  expected: {expected}")
+
+    print()
+    if failed:
+        print(f"{len(failed)} algorithm{'' if len(failed) == 1 else 's'} FAILED :(")
+        sys.exit(1)
+    print(f"ALL PASSED :)")
+
+
+if __name__ == '__main__':
+    main()
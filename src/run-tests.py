@@ -20,129 +20,1202 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import subprocess
+import argparse
+import collections
+import hashlib
 import json
+import itertools
+import os
+import random
+import shlex
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # locations of the testvectors
 from testvectors.lib import general_testcases
 from testvectors.lib import hmac_testcases
+from testvectors.lib import catalog
+from testvectors.lib import compression
+from testvectors.lib import config
+from testvectors.lib import jacksum
+from testvectors.lib import loader
+from testvectors.lib import reporting
+from testvectors.lib import units
 
 TESTVECTORS_JSON = 'testvectors/json'
 
-# user init
-# APP = ["java", "-jar", "jacksum-3.7.0.jar"]
-APP = ["java", "-jar", "jacksum-3.8.0-SNAPSHOT.jar"]
-APP = ["java", "-jar", "/Users/Johann/IdeaProjects/jacksum/target/jacksum-3.8.0-SNAPSHOT.jar"]
-
-TEST_ALGOS = [
-    # SHA3 family
-    'sha3-224','sha3-256', 'sha3-384', 'sha3-512',
-
-    # All 3rd round candidates of the NIST SHA-3 competition
-    'blake-224',     'blake-256',      'blake-384',     'blake-512',
-    'groestl-224',   'groestl-256',   'groestl-384',   'groestl-512',
-    'jh-224',        'jh-256',        'jh-384',        'jh-512',
-    'keccak-224',    'keccak-256',    'keccak-384',    'keccak-512',
-    'skein-512-224', 'skein-512-256', 'skein-512-384', 'skein-512-512',
-
-    # 2nd round candidates of the NIST SHA-3 competition
-    'echo-224',      'echo-256',      'echo-384',      'echo-512',
-    'fugue-224',     'fugue-256',     'fugue-384',     'fugue-512',
-    'luffa-224',     'luffa-256',     'luffa-384',     'luffa-512',
-    'bluemidnightwish-224', 'bluemidnightwish-256', 'bluemidnightwish-384', 'bluemidnightwish-512',
-    'simd-224',      'simd-256',      'simd-384',      'simd-512',
-    'cubehash-224',  'cubehash-256',  'cubehash-384',  'cubehash-512',
-    'hamsi-224',     'hamsi-256',     'hamsi-384',     'hamsi-512',
-    'shabal-224',    'shabal-256',    'shabal-384',    'shabal-512',
-   #'shavite-224',   'shavite-256',   'shavite-384',   'shavite-512',
-
-    # NIST lightweight cryptography competition 2023: finalists ###
-    'ascon-hash', 'ascon-hasha', 'ascon-xof', 'ascon-xofa',
-    'romulus-h',
-
-    # derived from
-    # https://reveng.sourceforge.io/crc-catalogue/all.htm
-    'crc-catalogue',
-
-    # CRC64/JONES by Professor David T. Jones at University College London, see also
-    # http://www0.cs.ucl.ac.uk/staff/d.jones/crcnote.pdf
-    # http://bioinf.cs.ucl.ac.uk/downloads/crc64/crc64.c
-    'crc64-jones'
+def read_testcases_from_json(filename, segments=None):
+    source = os.path.splitext(os.path.basename(compression.basename(filename)))[0]
+    return loader.read_json(filename, source, segments)
+
+
+def catalog_segments(filename=catalog.CATALOG):
+    """Returns the raw files of the testvectors of every json file, see catalog.segments(), or {} if there is no
+    catalog. Testcases whose raw file is unknown are identified by their ordinal in the json file."""
+    try:
+        return catalog.segments(filename)
+    except (OSError, sqlite3.Error):
+        return {}
+
+
+def load_testcases(catalog_filename=catalog.CATALOG):
+    """Yields all testcases lazily, file by file."""
+    yield from loader.from_dicts(general_testcases.get(), 'general')
+    yield from loader.from_dicts(hmac_testcases.get(), 'hmac')
+
+    segments = catalog_segments(catalog_filename)
+    for algo in config.TEST_ALGOS:
+        yield from read_testcases_from_json(compression.find(f'{TESTVECTORS_JSON}/{algo}.json'), segments.get(algo))
+
+    for algo in config.GENERATED_ALGOS:
+        filename = compression.find(f'{TESTVECTORS_JSON}/{algo}.json')
+        if os.path.exists(filename):
+            yield from read_testcases_from_json(filename, segments.get(algo))
+
+
+def json_ordinal(id, segments):
+    """Returns the source and the ordinal in its json file of a testcase id, see catalog.testcase_id().
+    Raises a ValueError if the id is invalid or unknown."""
+    source, _, position = id.strip().rpartition('#')
+    if not source or not position.isdigit():
+        raise ValueError(f"invalid testcase id {id}, e.g. sha3-224/SHA3_224ShortMsg.rsp#17 was expected")
+    algo, _, raw = source.partition('/')
+    if not raw:
+        return algo, int(position)
+    for first, segment, count in segments.get(algo, []):
+        if segment == raw:
+            if not 1 <= int(position) <= count:
+                raise ValueError(f"there is no testcase {id}")
+            return algo, first + int(position) - 1
+    if not segments:
+        raise ValueError(f"unknown source {source}, the catalog is required, run convert-testvectors-text2json.py "
+                         f"to create it")
+    raise ValueError(f"unknown source {source}")
+
+
+def testcases_by_id(ids, catalog_filename=catalog.CATALOG):
+    """Yields the testcases with the given ids (e.g. sha3-224/SHA3_224ShortMsg.rsp#17 or hmac#3) in the order of the
+    testcases. The testcases of the json files are read at their offsets, so the files are not read up to them.
+    Raises a ValueError if there is no testcase with one of the ids."""
+    segments = catalog_segments(catalog_filename)
+    ordinals = {}
+    for id in ids:
+        source, ordinal = json_ordinal(id, segments)
+        ordinals.setdefault(source, set()).add(ordinal)
+
+    for source, testcases in (('general', general_testcases.get), ('hmac', hmac_testcases.get)):
+        if source in ordinals:
+            cases = list(loader.from_dicts(testcases(), source))
+            for ordinal in sorted(ordinals.pop(source)):
+                if not 1 <= ordinal <= len(cases):
+                    raise ValueError(f"there is no testcase {source}#{ordinal}")
+                yield cases[ordinal - 1]
+
+    for algo in config.TEST_ALGOS + config.GENERATED_ALGOS:
+        if algo in ordinals:
+            filename = compression.find(f'{TESTVECTORS_JSON}/{algo}.json')
+            yield from loader.read_json_at(filename, algo, ordinals.pop(algo), segments.get(algo))
+
+    if ordinals:
+        raise ValueError(f"unknown source {min(ordinals)}")
+
+
+def failed_ids(filename):
+    """Returns the ids of the testcases which have not passed in the results written by --jsonl."""
+    ids = []
+    with compression.open_text(filename) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                # the shard and the number of testcases of the run are no results
+                if 'test' in record and not record['verdict'].startswith('PASSED'):
+                    ids.append(record['id'])
+    return ids
+
+
+def select_testcases(where, filename=catalog.CATALOG):
+    """Yields the testcases of TEST_ALGOS and GENERATED_ALGOS in the catalog which match the SQL expression where,
+    e.g. "algo LIKE 'skein%' AND msglen < 1024"."""
+    yield from loader.read_catalog(filename, where, config.TEST_ALGOS + config.GENERATED_ALGOS)
+
+
+# block sizes in bytes of the algorithms, used to put testcases of the smoke test into buckets,
+# the first prefix that matches the algorithm is used
+BLOCK_SIZES = [
+    ('sha3-224', 144), ('sha3-256', 136), ('sha3-384', 104), ('sha3-512', 72),
+    ('keccak-224', 144), ('keccak-256', 136), ('keccak-384', 104), ('keccak-512', 72),
+    ('blake-384', 128), ('blake-512', 128),
+    ('groestl-384', 128), ('groestl-512', 128),
+    ('echo-224', 192), ('echo-256', 192), ('echo-384', 128), ('echo-512', 128),
+    ('bluemidnightwish-384', 128), ('bluemidnightwish-512', 128),
+    ('simd-384', 128), ('simd-512', 128),
+    ('shavite-384', 128), ('shavite-512', 128),
+    ('hamsi-224', 4), ('hamsi-256', 4), ('hamsi-384', 8), ('hamsi-512', 8),
+    ('fugue', 4), ('luffa', 32), ('cubehash', 32), ('ascon', 8), ('romulus-h', 32)
+]
+DEFAULT_BLOCK_SIZE = 64
+# messages longer than this are from the LongMsg testvectors
+SHORT_MSG_MAX_LENGTH = 256
+
+
+def block_size(algo):
+    for prefix, size in BLOCK_SIZES:
+        if algo.startswith(prefix):
+            return size
+    return DEFAULT_BLOCK_SIZE
+
+
+def message_bucket(testcase):
+    """Returns the bucket of the testcase by the length of its message relative to the block size."""
+    length = testcase.message_length()
+    size = block_size(loader.algorithm(testcase) or '')
+    if length == 0:
+        return 'empty'
+    if length > SHORT_MSG_MAX_LENGTH:
+        return 'LongMsg'
+    if length % size in (0, 1, size - 1) and length >= size - 1:
+        return 'block boundary'
+    if length < size:
+        return 'sub-block'
+    return 'multi-block'
+
+
+def smoke_testcases(testcases, budget, seed, statistics):
+    """Yields a stratified sample of the testcases that can be performed within budget seconds.
+    The testcases are grouped by their source and the bucket of their message length. The first round takes one
+    testcase of every group, so every algorithm is covered, every further round takes the next testcase of every
+    group as long as the throughput measured so far promises that it finishes in time.
+    Given the same seed, the testcases are sampled in the same order."""
+    strata = {}
+    for case in testcases:
+        strata.setdefault((case.source, message_bucket(case)), []).append(case)
+    rng = random.Random(seed)
+    for cases in strata.values():
+        rng.shuffle(cases)
+
+    start = time.monotonic()
+    submitted = 0
+    for round in itertools.count():
+        remaining = [cases for cases in strata.values() if round < len(cases)]
+        if not remaining:
+            return
+        for cases in remaining:
+            if round > 0:
+                elapsed = time.monotonic() - start
+                done = statistics['passed'] + len(statistics['failed']) + len(statistics['timeouts'])
+                # the testcases which are still in flight have to finish in time, too
+                if done == 0 or elapsed + (submitted - done + 1) * elapsed / done > budget:
+                    return
+            submitted += 1
+            yield cases[round]
+
+
+def cost_factor(algo):
+    """Returns how much slower algo hashes than an average algorithm, see SHARD_COST_FACTORS."""
+    if algo.startswith('hmac:'):
+        algo = algo[len('hmac:'):]
+    for prefix, factor in SHARD_COST_FACTORS:
+        if algo.startswith(prefix):
+            return factor
+    return 1.0
+
+
+def estimated_cost(testcase):
+    """Returns the estimated time in seconds to perform the testcase. It depends only on the testcase, so that
+    it is the same on every machine: a testcase which can't be batched costs a JVM start, and the message
+    costs its length, weighted by the speed of the algorithm."""
+    factor = cost_factor(loader.algorithm(testcase) or '')
+    hashing = factor * testcase.message_length() / SHARD_THROUGHPUT
+    if loader.batch_key(testcase) is None:
+        return SHARD_CALL_COST + hashing
+    return factor * SHARD_BATCHED_COST + hashing
+
+
+def shard_testcases(testcases, index, count):
+    """Yields the testcases of shard index (1-based) of count shards. Every testcase is assigned to the shard
+    with the least estimated cost so far, the first one on ties, so that all shards take about the same time.
+    The assignment depends only on the testcases and their order, so a shard can be run again on its own and on
+    any machine. The testcases are numbered as in a run without shards."""
+    loads = [0.0] * count
+    for number, case in enumerate(testcases, 1):
+        shard = min(range(count), key=loads.__getitem__)
+        loads[shard] += estimated_cost(case)
+        if shard == index - 1:
+            case.number = number
+            yield case
+
+
+def parse_shard(shard):
+    """Parses a shard like 2/4 and returns the index and the number of shards."""
+    index, _, count = shard.partition('/')
+    index, count = int(index), int(count)
+    if not 1 <= index <= count:
+        raise ValueError(f"invalid shard {shard}")
+    return index, count
+
+
+# estimated costs of testcases to balance shards, see estimated_cost(): a testcase which is performed by a call
+# of its own, a testcase which is performed in a batch, and the throughput in bytes/s
+SHARD_CALL_COST = 0.3
+SHARD_BATCHED_COST = 0.005
+SHARD_THROUGHPUT = 50 << 20
+# how much slower than SHARD_THROUGHPUT an algorithm hashes, a rough and static ranking of the families, so that
+# the shards are the same on every machine, the first prefix that matches the algorithm (without hmac:) is used
+SHARD_COST_FACTORS = [
+    ('crc', 0.2),
+    ('blake', 0.8), ('bluemidnightwish', 0.8), ('shabal', 0.8), ('skein', 0.8), ('sha-', 0.8), ('sha2', 0.8),
+    ('sha3', 1.5), ('keccak', 1.5), ('cubehash', 1.5), ('luffa', 1.5),
+    ('echo', 2.5), ('fugue', 2.5), ('groestl', 2.5), ('jh', 2.5), ('simd', 2.5), ('shavite', 2.0),
+    ('hamsi', 3.0), ('ascon', 3.0),
+    ('romulus-h', 8.0)
 ]
 
+# timeouts as long as the startup of the JVM has not been calibrated, see Durations
+DEFAULT_TIMEOUT = 5
+# the timeout of a batch grows with the number of testcases in the batch
+BATCH_TIMEOUT_PER_TESTCASE = 0.1
+# a call of Jacksum may take this many times longer than estimated before it times out
+TIMEOUT_FACTOR = 5
+# no timeout is shorter than this
+MIN_TIMEOUT = 1.0
+# throughput in bytes/s that is assumed for an algorithm as long as it hasn't been measured
+DEFAULT_THROUGHPUT = 1 << 20
+# the throughput is measured only by calls which hash at least this number of bytes
+THROUGHPUT_MIN_LENGTH = 1 << 16
+# a testcase that has timed out is performed once more after this delay, with a timeout that is this much longer
+RETRY_DELAY = 1.0
+RETRY_TIMEOUT_FACTOR = 4
+
+# messages up to this length in bytes are passed on the command line in auto mode, see message_delivery()
+ARGV_MAX_MESSAGE_LENGTH = 1024
+# messages of at least this length in bytes are passed as a file in auto mode, shorter ones on stdin
+FILE_MIN_MESSAGE_LENGTH = 1 << 20
+
+# results of passed testcases are cached here, see ResultCache
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')), 'jacksum-testcases')
+CACHE = os.path.join(CACHE_DIR, 'results.sqlite')
+CACHE_MAX_ENTRIES = 1000000
+# time in seconds a run waits for another run that is writing to the same cache
+CACHE_BUSY_TIMEOUT = 10
+
+# class-data-sharing archives of --warm-start are stored next to the jar, or here if that is not writable
+CDS_DIR = os.path.join(CACHE_DIR, 'cds')
+# number of calls of --version by which the startup time with and without the archive is measured
+CDS_STARTUP_CALLS = 3
+# the durations of the calls of previous runs, see Durations
+DURATIONS = os.path.join(CACHE_DIR, 'durations.json')
+# the weight of a new duration in the estimates of Durations
+DURATION_WEIGHT = 0.2
+
+backend = jacksum.SubprocessBackend(config.APP)
+
+
+class Durations:
+    """Estimates how long a call of Jacksum takes: the startup time of the JVM plus the time per testcase and the
+    time to hash the messages at the throughput of the algorithm. The estimates are updated by every call and saved,
+    so that the next run starts with the estimates of the previous ones. They give the timeout of a call, which is
+    TIMEOUT_FACTOR times the estimate, and the cost of a batch, by which --schedule longest-first orders the batches.
+    The startup time is measured at launch by calibrate(), until then the timeouts are fixed."""
+
+    def __init__(self, filename=None, fixed=None):
+        self.filename = filename
+        self.fixed = fixed
+        durations = {}
+        if filename is not None:
+            try:
+                with open(filename, encoding='utf-8') as f:
+                    durations = json.load(f)
+            except (OSError, ValueError):
+                pass
+        # the startup time of a previous run counts until calibrate() has measured it
+        self.startup = durations.get('startup')
+        self.calibrated = False
+        # algo -> {'per_testcase': seconds, 'throughput': bytes/s}
+        self.algorithms = durations.get('algorithms', {})
+        self.lock = threading.Lock()
+
+    def calibrate(self, args=("--version",)):
+        """Measures the startup time of the JVM by calling Jacksum twice with args, which should take no time.
+        The faster call is taken, so that a cold cache doesn't count. Returns the startup time in seconds."""
+        times = []
+        for _ in range(2):
+            start = time.monotonic()
+            execute(list(args), jacksum.CALIBRATION_TIMEOUT)
+            times.append(time.monotonic() - start)
+        self.startup = min(times)
+        self.calibrated = True
+        return self.startup
+
+    def estimates(self, algo):
+        with self.lock:
+            return dict(self.algorithms.get(algo, {}))
+
+    def timeout(self, algo, length, calls=1):
+        """Returns the timeout in seconds for a call of Jacksum which performs calls testcases, e.g. a batch, and
+        hashes length bytes by algo in total. An algorithm that hasn't been measured yet gets a generous timeout."""
+        if self.fixed is not None:
+            return self.fixed
+        if not self.calibrated:
+            return DEFAULT_TIMEOUT + (BATCH_TIMEOUT_PER_TESTCASE * calls if calls > 1 else 0)
+        estimates = self.estimates(algo)
+        return max(MIN_TIMEOUT, TIMEOUT_FACTOR * (self.startup
+                                                  + calls * estimates.get('per_testcase', BATCH_TIMEOUT_PER_TESTCASE)
+                                                  + length / estimates.get('throughput', DEFAULT_THROUGHPUT)))
+
+    def cost(self, batch):
+        """Returns the estimated time in seconds to perform the batch of testcases. An algorithm that hasn't been
+        measured yet costs as much as it does for balancing shards, see estimated_cost()."""
+        estimates = self.estimates(loader.algorithm(batch[0]))
+        length = sum(case.message_length() for case in batch)
+        return (self.startup_or(SHARD_CALL_COST) + len(batch) * estimates.get('per_testcase', SHARD_BATCHED_COST)
+                + length / estimates.get('throughput', SHARD_THROUGHPUT))
+
+    def startup_or(self, default):
+        return self.startup if self.startup is not None else default
+
+    def observe(self, algo, length, elapsed, calls=1):
+        """Updates the estimates of algo by a call that has performed calls testcases with length bytes in total
+        in elapsed seconds. Long messages update the throughput, batches of short ones the time per testcase,
+        in a single call of a short message the time per testcase can't be told from the startup time."""
+        hashing = elapsed - self.startup_or(0)
+        if algo is None or hashing <= 0:
+            return
+        if length >= THROUGHPUT_MIN_LENGTH:
+            key, value = 'throughput', length / hashing
+        elif calls > 1:
+            key, value = 'per_testcase', hashing / calls
+        else:
+            return
+        with self.lock:
+            estimates = self.algorithms.setdefault(algo, {})
+            previous = estimates.get(key)
+            estimates[key] = value if previous is None else (1 - DURATION_WEIGHT) * previous + DURATION_WEIGHT * value
+
+    def save(self):
+        """Writes the estimates to the file they have been read from, the previous one is replaced atomically."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.filename)), exist_ok=True)
+        with self.lock:
+            durations = {'startup': self.startup, 'algorithms': self.algorithms}
+            with open(f"{self.filename}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(durations, f, indent=2, sort_keys=True)
+        os.replace(f"{self.filename}.tmp", self.filename)
+
+
+durations = Durations()
+
+# how messages are passed to Jacksum, see message_delivery()
+message_mode = 'auto'
+
+
+def execute(args, timeout=5, input=None):
+    """Calls Jacksum with the given args and input bytes on stdin and returns stdout, stderr, the exit status
+    and the Usage of the call. Raises subprocess.TimeoutExpired if Jacksum did not finish in time."""
+    if input is None:
+        return backend.execute(args, timeout)
+    return backend.execute(args, timeout, input)
+
+
+def cancel(futures):
+    """Cancels all pending futures and kills all Jacksum processes that are still running."""
+    for future in futures:
+        future.cancel()
+    jacksum.kill_all()
+
+
+def check(testcase, stdout, stderr, usage=None):
+    """Compares the output of Jacksum with the expected value and returns the result of the testcase,
+    with the Usage of the call that has performed it."""
+    lines = []
+    actual = stdout.strip()
+    actual_stderr = stderr.strip()
+    expected = testcase.expected
+    if actual == expected:
+        lines.append(f"stdout:   {actual}")
+        verdict = "PASSED"
+    elif actual.partition('\n')[0] == expected:
+        lines.append(f"stdout:   {actual}")
+        lines.append(f"stderr:   {actual_stderr}")
+        lines.append(f"Expected: {expected}")
+        verdict = "PASSED (first line only)"
+    else:
+        lines.append(f"stdout:   {actual}")
+        lines.append(f"stderr:   {actual_stderr}")
+        lines.append(f"Expected: {expected}")
+        verdict = "FAILED"
+    lines.append(f"{verdict}\n")
+
+    return {
+        'id': testcase.id,
+        'desc': testcase.desc,
+        'source': testcase.source,
+        'args': list(testcase.args),
+        'verdict': verdict,
+        'passed': verdict != "FAILED",
+        'usage': usage,
+        'lines': lines
+    }
+
+
+def message_delivery(testcase):
+    """Returns how the message of the testcase is passed to Jacksum: as hex on the command line (argv), as bytes
+    on stdin (stdin) or as a file (file). Only the message of testcases which can be batched (see batch_key())
+    can be passed in another way than argv. In auto mode, long messages are passed on stdin and very long ones as a
+    file, if the backend has no stdin, those messages are passed as a file."""
+    if message_mode == 'argv' or loader.batch_key(testcase) is None:
+        return 'argv'
+    mode = message_mode
+    if mode == 'auto':
+        length = testcase.message_length()
+        if length <= ARGV_MAX_MESSAGE_LENGTH:
+            return 'argv'
+        mode = 'file' if length >= FILE_MIN_MESSAGE_LENGTH else 'stdin'
+    if mode == 'stdin' and not backend.accepts_input:
+        return 'file'
+    return mode
+
+
+def execute_testcase(testcase, timeout):
+    """Calls Jacksum for the testcase, the message is passed as determined by message_delivery()."""
+    delivery = message_delivery(testcase)
+    if delivery == 'argv':
+        return execute(testcase.args, timeout)
+    algo, encoding = loader.batch_key(testcase)
+    message = bytes.fromhex(testcase.args[3][len('hex:'):])
+    args = ["-a", algo, "-E", encoding, "-F", "#CHECKSUM"]
+    if delivery == 'stdin':
+        return execute(args + ["-"], timeout, input=message)
+    with tempfile.NamedTemporaryFile(prefix='jacksum-msg-', suffix='.bin', dir=jacksum.MESSAGE_DIR, delete=False) as f:
+        f.write(message)
+    try:
+        return execute(args + [f.name], timeout)
+    finally:
+        os.remove(f.name)
+
+
+def testcase(testcase):
+    """Performs a single testcase and returns a result with the verdict and the lines to be printed.
+    The result is printed by report() so that the output stays in order even if tests run in parallel.
+    A testcase that times out is performed once more with a longer timeout before it is reported as a timeout."""
+    if jacksum.cancelled.is_set():
+        return None
+    algo = loader.algorithm(testcase)
+    length = testcase.message_length()
+    timeout = durations.timeout(algo, length)
+    for attempt in range(2):
+        if attempt > 0:
+            time.sleep(RETRY_DELAY)
+            timeout *= RETRY_TIMEOUT_FACTOR
+        try:
+            stdout, stderr, status, usage = execute_testcase(testcase, timeout)
+            durations.observe(algo, length, usage.wall)
+            return check(testcase, stdout, stderr, usage)
+        except subprocess.TimeoutExpired:
+            if jacksum.cancelled.is_set():
+                break
+
+    return {
+        'id': testcase.id,
+        'desc': testcase.desc,
+        'source': testcase.source,
+        'args': list(testcase.args),
+        'verdict': "TIMEOUT",
+        'passed': False,
+        'timeout': True,
+        'lines': [f"Timeout expired, also after a retry with {timeout:.1f}s.",
+                  f"TIMEOUT\n"]
+    }
+
+
+def batches(testcases, size):
+    """Groups consecutive testcases that differ only in the message into batches of up to size testcases.
+    Testcases which cannot be batched are returned as batches with a single testcase."""
+    batch = []
+    key = None
+    for case in testcases:
+        case_key = loader.batch_key(case) if size > 1 else None
+        if batch and (case_key != key or len(batch) >= size):
+            yield batch
+            batch = []
+        if case_key is None:
+            yield [case]
+        else:
+            key = case_key
+            batch.append(case)
+    if batch:
+        yield batch
+
+
+def combined_batches(testcases, size):
+    """Groups the testcases which can be batched by their message and encoding across all algorithms, e.g. the
+    KAT files of the SHA-3 candidates which all hash the same messages. Messages which are hashed by the same
+    algorithms are grouped into batches of up to size messages, which are performed by a single Jacksum call
+    that computes all algorithms at once. If the same message is hashed by an algorithm more than once, the
+    testcases are grouped as if they had different messages. The other testcases are batched as usual."""
+    messages = {}
+    others = []
+    for case in testcases:
+        key = loader.batch_key(case) if size > 1 else None
+        if key is None:
+            others.append(case)
+            continue
+        algo, encoding = key
+        occurrences = messages.setdefault((case.args[3], encoding), [])
+        for cases in occurrences:
+            if all(loader.algorithm(other) != algo for other in cases):
+                cases.append(case)
+                break
+        else:
+            occurrences.append([case])
+
+    groups = {}
+    for (_, encoding), occurrences in messages.items():
+        for cases in occurrences:
+            groups.setdefault((tuple(loader.algorithm(case) for case in cases), encoding), []).append(cases)
+    for algos, encoding in groups:
+        cases = groups[(algos, encoding)]
+        for i in range(0, len(cases), size):
+            yield [case for message in cases[i:i + size] for case in message]
+    yield from batches(others, size)
+
+
+def share(elapsed, startup, count):
+    """Returns the time of a call which has taken elapsed seconds that is attributed to one of count algorithms
+    computed by the call: the startup and an even share of the rest."""
+    return startup + max(0.0, elapsed - startup) / count
+
+
+def testcase_combined(cases):
+    """Performs testcases of several algorithms with the same messages by a single Jacksum call, which computes
+    all algorithms at once (-a algo1+algo2+...). The output is the concatenation of the digests, it is split by
+    the lengths of the expected values. Testcases without the expected digest are performed by batches per
+    algorithm, so that a failure is reported the same way as without combining."""
+    if jacksum.cancelled.is_set():
+        return [None] * len(cases)
+    algos = list(dict.fromkeys(loader.algorithm(case) for case in cases))
+    lengths = {}
+    for case in cases:
+        lengths.setdefault(loader.algorithm(case), len(case.expected))
+    _, encoding = loader.batch_key(cases[0])
+    messages = list(dict.fromkeys(case.args[3] for case in cases))
+    digests = {}
+    with tempfile.TemporaryDirectory(prefix='jacksum-combined-', dir=jacksum.MESSAGE_DIR) as directory:
+        filenames = {}
+        for i, message in enumerate(messages):
+            filename = os.path.join(directory, f"{i}.bin")
+            with open(filename, 'wb') as f:
+                f.write(bytes.fromhex(message[len('hex:'):]))
+            filenames[message] = filename
+        filelist = os.path.join(directory, 'filelist.txt')
+        with open(filelist, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(filenames.values()) + '\n')
+
+        # every algorithm hashes all messages
+        length = sum(len(message[len('hex:'):]) // 2 for message in messages)
+        usage = None
+        try:
+            stdout, stderr, status, usage = execute(["-a", '+'.join(algos), "-E", encoding,
+                                                     "-F", "#CHECKSUM #FILENAME", "-L", filelist],
+                                                    timeout=max(durations.timeout(algo, length * len(algos),
+                                                                                  len(cases))
+                                                                for algo in algos))
+            # the startup is shared by all algorithms, the rest of the call is split evenly among them
+            for algo in algos:
+                durations.observe(algo, length, share(usage.wall, durations.startup_or(0), len(algos)), len(messages))
+            usage = jacksum.Usage(*(None if value is None else value / len(cases) for value in usage[:3]), usage.maxrss)
+            for line in stdout.splitlines():
+                combined, _, filename = line.partition(' ')
+                if len(combined) != sum(lengths.values()):
+                    continue
+                pos = 0
+                for algo in algos:
+                    digests[(filename, algo)] = combined[pos:pos + lengths[algo]]
+                    pos += lengths[algo]
+        except subprocess.TimeoutExpired:
+            pass
+
+    results = {}
+    failed = {}
+    for i, case in enumerate(cases):
+        digest = digests.get((filenames[case.args[3]], loader.algorithm(case)))
+        if digest == case.expected:
+            results[i] = check(case, digest, '', usage)
+        else:
+            failed.setdefault(loader.algorithm(case), []).append(i)
+    for indexes in failed.values():
+        for i, result in zip(indexes, perform_uncached([cases[i] for i in indexes])):
+            results[i] = result
+    return [results[i] for i in range(len(cases))]
+
+
+def testcase_batch(cases):
+    """Performs testcases which differ only in the message by a single Jacksum call.
+    Every message is written to a file, and Jacksum reads the list of those files, so the JVM is started once
+    for the whole batch. Testcases without the expected line in the output are performed by a single call,
+    so that a failure is reported the same way as without batching."""
+    if jacksum.cancelled.is_set():
+        return [None] * len(cases)
+    algo, encoding = loader.batch_key(cases[0])
+    digests = {}
+    with tempfile.TemporaryDirectory(prefix='jacksum-batch-', dir=jacksum.MESSAGE_DIR) as directory:
+        filenames = []
+        for i, case in enumerate(cases):
+            filename = os.path.join(directory, f"{i}.bin")
+            with open(filename, 'wb') as f:
+                f.write(bytes.fromhex(case.args[3][len('hex:'):]))
+            filenames.append(filename)
+        filelist = os.path.join(directory, 'filelist.txt')
+        with open(filelist, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(filenames) + '\n')
+
+        length = sum(case.message_length() for case in cases)
+        usage = None
+        try:
+            stdout, stderr, status, usage = execute(["-a", algo, "-E", encoding, "-F", "#CHECKSUM #FILENAME",
+                                                     "-L", filelist],
+                                                    timeout=durations.timeout(algo, length, len(cases)))
+            durations.observe(algo, length, usage.wall, len(cases))
+            # every testcase of the batch gets its share of the times, and the peak RSS of the whole call
+            usage = jacksum.Usage(*(None if value is None else value / len(cases) for value in usage[:3]), usage.maxrss)
+            for line in stdout.splitlines():
+                digest, _, filename = line.partition(' ')
+                digests[filename] = digest
+        except subprocess.TimeoutExpired:
+            pass
+
+    results = []
+    for case, filename in zip(cases, filenames):
+        if digests.get(filename) == case.expected:
+            results.append(check(case, digests[filename], '', usage))
+        else:
+            results.append(testcase(case))
+    return results
+
+
+def jar_digest(jar):
+    """Returns the SHA-256 of the jar as hex."""
+    digest = hashlib.sha256()
+    with open(jar, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-def read_testcases_from_json(filename):
-    with open(filename) as json_file:
-        return json.load(json_file)
 
+def jvm_options(app, *options):
+    """Returns the command app with additional options for the JVM, which are inserted before -jar <jar>."""
+    return app[:-2] + list(options) + app[-2:]
 
-# test cases
-testcases = []
-testcases.extend(general_testcases.get())
-testcases.extend(hmac_testcases.get())
 
-for algo in TEST_ALGOS:
-    testcases += read_testcases_from_json(f'{TESTVECTORS_JSON}/{algo}.json')
-    pass
+def startup_time(app, calls=CDS_STARTUP_CALLS):
+    """Returns the fastest of calls of app with --version in seconds."""
+    times = []
+    for _ in range(calls):
+        start = time.monotonic()
+        subprocess.run(app + ["--version"], stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, timeout=jacksum.CALIBRATION_TIMEOUT, check=True)
+        times.append(time.monotonic() - start)
+    return min(times)
 
-counter = 0
 
-statistics = {
-    "passed": 0,
-    "failed": []
-}
+def cds_archive(app):
+    """Returns the filename of the class-data-sharing archive for the jar and the JDK of app. The name contains
+    a hash of the jar and of the version of the JDK, so that an archive is never used by another jar or JDK."""
+    jar = app[-1]
+    version = subprocess.run(app[:-2] + ["-version"], stdin=subprocess.DEVNULL, capture_output=True,
+                             universal_newlines=True, timeout=jacksum.CALIBRATION_TIMEOUT).stderr
+    key = hashlib.sha256((jar_digest(jar) + version).encode('utf-8')).hexdigest()[:16]
+    name = f"{os.path.splitext(os.path.basename(jar))[0]}-{key}.jsa"
+    directory = os.path.dirname(os.path.abspath(jar))
+    if not os.access(directory, os.W_OK):
+        os.makedirs(CDS_DIR, exist_ok=True)
+        directory = CDS_DIR
+    return os.path.join(directory, name)
 
 
-def testcase(counter, testcase, statistics):
-    print(f"Test #{counter}: {testcase['desc']}")
-    print(f"Args: {testcase['args']}")
+def warm_start(app, training):
+    """Returns app with a class-data-sharing (AppCDS) archive, so that the JVM loads the classes of Jacksum from
+    the archive instead of the jar. The archive is created once by a training call of Jacksum with the args
+    training, and reused as long as the jar and the JDK don't change. Returns app itself, and None as the
+    archive, if the JVM doesn't support it (JDK 13 or later is required)."""
     try:
-        process = subprocess.run(APP + testcase['args'],
-                                 stdin=subprocess.PIPE,
-                                 stdout=subprocess.PIPE,
-                                 stderr=subprocess.PIPE,
-                                 universal_newlines=True,
-                                 timeout=5)
-
-        actual = process.stdout.strip()
-        actual_stderr = process.stderr.strip()
-        expected = testcase['expected']
-        if actual == expected:
-            print(f"stdout:   {actual}")
-            print(f"PASSED\n")
-            statistics['passed'] += 1
-        elif actual.partition('\n')[0] == expected:
-            print(f"stdout:   {actual}")
-            print(f"stderr:   {actual_stderr}")
-            print(f"Expected: {expected}")
-            print(f"PASSED (first line only)\n")
-            statistics['passed'] += 1
+        archive = cds_archive(app)
+        if not os.path.exists(archive):
+            subprocess.run(jvm_options(app, f"-XX:ArchiveClassesAtExit={archive}") + training,
+                           stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           timeout=jacksum.CALIBRATION_TIMEOUT)
+            if not os.path.exists(archive):
+                return app, None
+        warm = jvm_options(app, f"-XX:SharedArchiveFile={archive}", "-Xshare:auto")
+        # an archive which the JVM can't use is ignored by -Xshare:auto, but an unknown option fails
+        startup_time(warm, 1)
+        return warm, archive
+    except (OSError, subprocess.SubprocessError):
+        return app, None
+
+
+def training_args(algos):
+    """Returns the args of a call of Jacksum that loads the classes of all algos, it computes all of them
+    at once by combining them with +."""
+    return ["-a", "+".join(algos), "-q", "txt:0123456789", "-E", "hex"]
+
+
+class ResultCache:
+    """Remembers the testcases which have passed, so that they are not performed again as long as
+    the jar, the JVM options and the testcase itself have not changed. Entries are keyed by a hash of those,
+    and the least recently used entries are evicted if there are more than max_entries.
+    Every statement is committed at once and the database is in WAL mode, so that concurrent runs (e.g. the shards
+    of --shard on one machine) can share the cache. The cache only saves time: if it fails, it is disabled and
+    the run goes on without it."""
+
+    def __init__(self, filename, app, max_entries=CACHE_MAX_ENTRIES):
+        self.salt = jar_digest(app[-1]) + json.dumps(app[:-1])
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.connection = None
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        connection = sqlite3.connect(filename, timeout=CACHE_BUSY_TIMEOUT, isolation_level=None,
+                                     check_same_thread=False)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            # a commit doesn't wait for the disk, a crash may lose the last entries but not corrupt the cache
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, used REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+        except sqlite3.Error:
+            connection.close()
+            raise
+        self.connection = connection
+
+    def _disable(self, error):
+        """Closes the cache after an error, the testcases are performed without it from now on."""
+        print(f"Cache disabled: {error}", file=sys.stderr)
+        try:
+            self.connection.close()
+        except sqlite3.Error:
+            pass
+        self.connection = None
+
+    def key(self, testcase):
+        return hashlib.sha256(json.dumps([self.salt, testcase.args, testcase.expected]).encode('utf-8')).hexdigest()
+
+    def passed(self, testcase):
+        """Returns True if the testcase has passed before."""
+        key = self.key(testcase)
+        with self.lock:
+            if self.connection is None:
+                return False
+            try:
+                cursor = self.connection.execute("UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+            except sqlite3.Error as e:
+                self._disable(e)
+                return False
+            return cursor.rowcount > 0
+
+    def add(self, testcase):
+        key = self.key(testcase)
+        with self.lock:
+            if self.connection is None:
+                return
+            try:
+                self.connection.execute("INSERT OR REPLACE INTO results (key, used) VALUES (?, ?)",
+                                        (key, time.time()))
+            except sqlite3.Error as e:
+                self._disable(e)
+
+    def close(self):
+        with self.lock:
+            if self.connection is None:
+                return
+            try:
+                self.connection.execute("DELETE FROM results WHERE key IN "
+                                        "(SELECT key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                                        (self.max_entries,))
+            except sqlite3.Error as e:
+                print(f"Cache not trimmed: {e}", file=sys.stderr)
+            finally:
+                self.connection.close()
+                self.connection = None
+
+
+cache = None
+
+
+def cached(testcase):
+    return {
+        'id': testcase.id,
+        'desc': testcase.desc,
+        'source': testcase.source,
+        'args': list(testcase.args),
+        'verdict': "PASSED (cached)",
+        'passed': True,
+        'lines': [f"PASSED (cached)\n"]
+    }
+
+
+def perform_uncached(batch):
+    if len(batch) == 0:
+        return []
+    if len(batch) == 1:
+        return [testcase(batch[0])]
+    if len({loader.algorithm(case) for case in batch}) > 1:
+        return testcase_combined(batch)
+    return testcase_batch(batch)
+
+
+def perform(batch):
+    """Performs a batch of testcases and returns the list of their results.
+    Testcases which have passed before with the same jar are not performed again."""
+    if cache is None:
+        return perform_uncached(batch)
+
+    hits = [cache.passed(case) for case in batch]
+    results = iter(perform_uncached([case for case, hit in zip(batch, hits) if not hit]))
+    batch_results = []
+    for case, hit in zip(batch, hits):
+        if hit:
+            batch_results.append(cached(case))
         else:
-            print(f"stdout:   {actual}")
-            print(f"stderr:   {actual_stderr}")
-            print(f"Expected: {expected}")
-            print(f"FAILED\n")
-            statistics['failed'].extend([counter])
-
-    except subprocess.TimeoutExpired:
-        print(f"Timeout expired.")
-        print(f"FAILED\n")
-        statistics['failed'].extend([counter])
-
-
-# perform all testcases
-for case in testcases:
-    counter += 1
-    testcase(counter, case, statistics)
-
-# print some statistics and summary
-print(f"Result: {statistics}")
-if len(statistics['failed']) == 0:
-    print(f"ALL PASSED :)\n")
-else:
-    sum = len(statistics['failed'])
-    if sum == 1:
-        plural = ""
+            result = next(results)
+            if result is not None and result['passed']:
+                cache.add(case)
+            batch_results.append(result)
+    return batch_results
+
+
+# the resource usage of the testcases of a source: their number, the sums of their wall, user and sys times,
+# and the slowest and the most memory-hungry testcase, each a Peak or None
+SourceUsage = collections.namedtuple('SourceUsage', ['testcases', 'wall', 'user', 'sys', 'slowest', 'hungriest'])
+# the testcase with the largest value (wall time or peak RSS) of a source, by its counter and description
+Peak = collections.namedtuple('Peak', ['value', 'counter', 'desc'])
+
+
+class Resources:
+    """Collects the resource usage of the testcases per source, e.g. per algorithm."""
+
+    def __init__(self):
+        # source -> SourceUsage
+        self.sources = {}
+
+    def add(self, counter, result):
+        usage = result.get('usage')
+        if usage is None:
+            return
+        entry = self.sources.get(result['source'], SourceUsage(0, 0.0, 0.0, 0.0, None, None))
+        slowest, hungriest = entry.slowest, entry.hungriest
+        if slowest is None or usage.wall > slowest.value:
+            slowest = Peak(usage.wall, counter, result['desc'])
+        if usage.maxrss is not None and (hungriest is None or usage.maxrss > hungriest.value):
+            hungriest = Peak(usage.maxrss, counter, result['desc'])
+        self.sources[result['source']] = SourceUsage(entry.testcases + 1, entry.wall + usage.wall,
+                                                     entry.user + (usage.user or 0.0), entry.sys + (usage.sys or 0.0),
+                                                     slowest, hungriest)
+
+    def print_summary(self):
+        print(f"Resources per source, sorted by wall time:")
+        for source, entry in sorted(self.sources.items(), key=lambda item: -item[1].wall):
+            print(f"{source}: {entry.testcases} testcases, wall {entry.wall:.2f}s, user {entry.user:.2f}s, "
+                  f"sys {entry.sys:.2f}s")
+            print(f"  slowest:  Test #{entry.slowest.counter} ({entry.slowest.value:.2f}s): {entry.slowest.desc}")
+            if entry.hungriest is not None:
+                print(f"  peak RSS: Test #{entry.hungriest.counter} ({entry.hungriest.value / 1024:.1f} MiB): "
+                      f"{entry.hungriest.desc}")
+        print()
+
+
+resources = Resources()
+
+
+reporters = [reporting.ConsoleReporter()]
+
+
+def report(counter, result, statistics):
+    """Passes the result of a testcase to all reporters and updates the statistics.
+    Returns True if the testcase has passed."""
+    for reporter in reporters:
+        reporter.report(counter, result)
+    resources.add(counter, result)
+    if result['passed']:
+        statistics['passed'] += 1
+    elif result.get('timeout'):
+        statistics['timeouts'].append(result['id'])
+    else:
+        statistics['failed'].append(result['id'])
+    return result['passed']
+
+
+def run_testcases(testcases, statistics, jobs=1, fail_fast=False, batch_size=1, costs=None, combine=False):
+    """Performs all testcases using a pool of jobs workers.
+    Results are reported in the order of the testcases, regardless of the order in which they have finished.
+    Without a cost model, the testcases are performed in their order. With a cost model, all batches are
+    submitted at once, the most expensive ones first, so that long batches don't hold up the end of the run.
+    With combine, the testcases of all algorithms with the same message are batched, see combined_batches().
+    Returns False if the run has been stopped by fail_fast, otherwise True."""
+    jacksum.cancelled.clear()
+    executor = ThreadPoolExecutor(max_workers=jobs)
+    pending = collections.deque()
+    counter = 0
+
+    def drain(size):
+        nonlocal counter
+        while len(pending) > size:
+            batch, future = pending.popleft()
+            for case, result in zip(batch, future.result()):
+                counter = case.number if case.number is not None else counter + 1
+                if not report(counter, result, statistics) and fail_fast:
+                    return False
+        return True
+
+    try:
+        if costs is None and not combine:
+            for batch in batches(testcases, batch_size):
+                pending.append((batch, executor.submit(perform, batch)))
+                # don't queue more than necessary to keep all workers busy
+                if not drain(jobs * 2):
+                    return False
+            return drain(0)
+
+        testcases = list(testcases)
+        scheduled = list(combined_batches(testcases, batch_size) if combine else batches(testcases, batch_size))
+        order = range(len(scheduled))
+        if costs is not None:
+            estimates = [costs.cost(batch) for batch in scheduled]
+            order = sorted(order, key=lambda i: -estimates[i])
+        futures = {}
+        for i in order:
+            futures[i] = executor.submit(perform, scheduled[i])
+        pending.extend((batch, futures[i]) for i, batch in enumerate(scheduled))
+
+        # a combined batch has testcases of several sources, so every result is looked up by its testcase
+        positions = {id(case): n for n, case in enumerate(testcases)}
+        located = sorted((positions[id(case)], i, j) for i, batch in enumerate(scheduled)
+                         for j, case in enumerate(batch))
+        for n, i, j in located:
+            case = scheduled[i][j]
+            counter = case.number if case.number is not None else n + 1
+            if not report(counter, futures[i].result()[j], statistics) and fail_fast:
+                return False
+        return True
+    finally:
+        cancel([future for _, future in pending])
+        executor.shutdown(wait=True)
+
+
+def counted(testcases, totals):
+    """Yields the testcases and appends their number to totals once all of them have been yielded."""
+    number = 0
+    for number, case in enumerate(testcases, 1):
+        yield case
+    totals.append(number)
+
+
+def close_reporters():
+    """Closes all reporters, the files of a run that has been interrupted are complete up to the last result."""
+    global reporters
+    closing, reporters = reporters, []
+    for reporter in closing:
+        try:
+            reporter.close()
+        except OSError as e:
+            print(f"{e}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Performs the Jacksum testcases.')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='number of testcases to run in parallel (default: number of CPUs)')
+    parser.add_argument('--fail-fast', action='store_true',
+                        help='stop at the first failed testcase')
+    parser.add_argument('--batch-size', type=int, default=256,
+                        help='max. number of testcases of the same algorithm that are performed by a single '
+                             'Jacksum call, 1 disables batching (default: 256)')
+    parser.add_argument('--where',
+                        help='perform only the testcases in the catalog matching this SQL expression, '
+                             'e.g. "algo LIKE \'skein%%\' AND msglen < 1024", the columns are described '
+                             'in testvectors/lib/catalog.py')
+    parser.add_argument('--only', metavar='IDS',
+                        help='perform only the testcases with these comma separated ids, '
+                             'e.g. sha3-224/SHA3_224ShortMsg.rsp#17,hmac#3')
+    parser.add_argument('--rerun-failed', metavar='FILE',
+                        help='perform only the testcases which have not passed in the results written by --jsonl')
+    parser.add_argument('--catalog', default=catalog.CATALOG,
+                        help=f'catalog for --where and the raw files of the testcase ids '
+                             f'(default: {catalog.CATALOG})')
+    parser.add_argument('--schedule', choices=['in-order', 'longest-first'], default='in-order',
+                        help='perform the testcases in their order, or the most expensive ones first, estimated by '
+                             'the durations of previous runs, the results are reported in order either way '
+                             '(default: in-order, a smoke test by --budget is always performed in order)')
+    parser.add_argument('--durations', default=DURATIONS,
+                        help=f'file with the durations of previous runs (default: {DURATIONS})')
+    parser.add_argument('--combine', action='store_true',
+                        help='perform the testcases of all algorithms with the same message by a single Jacksum call '
+                             'which computes all of those algorithms at once, e.g. for the SHA-3 candidates')
+    parser.add_argument('--shard', type=parse_shard,
+                        help='perform only shard i of N shards given as i/N, e.g. 2/4, the shards are balanced by '
+                             'the estimated cost of their testcases, see merge-results.py')
+    parser.add_argument('--budget', type=units.parse_duration,
+                        help='smoke test: perform a stratified sample of the testcases of every algorithm which '
+                             'fits into this time, e.g. 60s or 5m')
+    parser.add_argument('--seed', type=int,
+                        help='seed of the smoke test sample (default: random)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='perform also the testcases which have passed before with the same jar')
+    parser.add_argument('--cache', default=CACHE,
+                        help=f'file that caches the passed testcases (default: {CACHE})')
+    parser.add_argument('--cache-size', type=int, default=CACHE_MAX_ENTRIES,
+                        help=f'max. number of cached testcases (default: {CACHE_MAX_ENTRIES})')
+    parser.add_argument('--backend', choices=['subprocess', 'daemon'], default='subprocess',
+                        help='start a JVM per call of Jacksum (subprocess), or perform all calls by a pool '
+                             'of long-lived JVMs (daemon) (default: subprocess)')
+    parser.add_argument('--daemon-requests', type=int, default=jacksum.DAEMON_MAX_REQUESTS,
+                        help=f'number of calls after which a daemon is replaced '
+                             f'(default: {jacksum.DAEMON_MAX_REQUESTS})')
+    parser.add_argument('--daemon-command',
+                        help='command that starts a daemon, e.g. a stub that speaks the protocol '
+                             '(default: java -cp <jar> daemon/JacksumDaemon.java <jar>)')
+    parser.add_argument('--message', choices=['auto', 'argv', 'stdin', 'file'], default='auto',
+                        help='pass messages as hex on the command line (argv), as bytes on stdin (stdin) or as a file '
+                             '(file), auto passes long messages on stdin and very long ones as a file (default: auto)')
+    parser.add_argument('--warm-start', action='store_true',
+                        help='start the JVM with a class-data-sharing archive of the jar, which is created once '
+                             'per jar and JDK next to the jar (JDK 13 or later)')
+    parser.add_argument('--resources', action='store_true',
+                        help='print the wall time, CPU time and peak RSS per source and its slowest and most '
+                             'memory-hungry testcase')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='print a progress counter and the testcases which have not passed only')
+    parser.add_argument('--jsonl', metavar='FILE',
+                        help='write the result of every testcase as a json object per line to FILE, '
+                             'e.g. results.jsonl or results.jsonl.gz')
+    parser.add_argument('--junit', metavar='FILE',
+                        help='write a JUnit XML report with a testsuite per source to FILE, e.g. junit.xml')
+    parser.add_argument('--timeout', type=units.parse_duration,
+                        help='fixed timeout of every call of Jacksum, e.g. 10s, by default the timeout is estimated '
+                             'from the startup time of the JVM, the length of the message and the throughput')
+    options = parser.parse_args()
+    if options.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    if options.batch_size < 1:
+        parser.error('--batch-size must be at least 1')
+
+    global backend, cache, durations, message_mode, reporters
+    message_mode = options.message
+    app = config.APP
+    reporters = [reporting.ConsoleReporter(verbose=not options.quiet)]
+    try:
+        if options.jsonl:
+            reporters.append(reporting.JsonLinesReporter(options.jsonl, options.shard))
+        if options.junit:
+            reporters.append(reporting.JUnitReporter(options.junit))
+    except OSError as e:
+        parser.error(str(e))
+    if not options.no_cache:
+        try:
+            cache = ResultCache(options.cache, app, options.cache_size)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Cache disabled: {e}", file=sys.stderr)
+    if options.warm_start:
+        cold = app
+        training = training_args([algo for algo in config.TEST_ALGOS if not algo.startswith('crc')])
+        app, archive = warm_start(app, training)
+        if archive is not None:
+            try:
+                print(f"Warm start by {archive}: startup {startup_time(cold):.2f}s -> {startup_time(app):.2f}s "
+                      f"per call\n")
+            except (OSError, subprocess.SubprocessError):
+                pass
+    backend = jacksum.SubprocessBackend(app)
+    if options.backend == 'daemon':
+        try:
+            command = shlex.split(options.daemon_command) if options.daemon_command else jacksum.daemon_command(app)
+            backend = jacksum.DaemonBackend(command, backend, options.daemon_requests)
+        except jacksum.DaemonError as e:
+            print(f"{e}, falling back to a JVM per call", file=sys.stderr)
+    durations = Durations(options.durations, options.timeout)
+    if options.timeout is None:
+        try:
+            print(f"JVM startup: {durations.calibrate():.2f}s\n")
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"Calibration failed, using a timeout of {DEFAULT_TIMEOUT}s: {e}", file=sys.stderr)
+
+    statistics = {
+        "passed": 0,
+        "failed": [],
+        "timeouts": []
+    }
+
+    if options.only or options.rerun_failed:
+        try:
+            ids = options.only.split(',') if options.only else failed_ids(options.rerun_failed)
+        except (OSError, ValueError, KeyError) as e:
+            parser.error(f"--rerun-failed: {e}")
+        if not ids:
+            print(f"No testcases to perform.")
+            return
+        try:
+            testcases = list(testcases_by_id(ids, options.catalog))
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    elif options.where:
+        if not os.path.exists(options.catalog):
+            parser.error(f"{options.catalog} not found, run convert-testvectors-text2json.py to create it")
+        try:
+            selected = catalog.count(options.catalog, options.where, config.TEST_ALGOS + config.GENERATED_ALGOS)
+        except sqlite3.Error as e:
+            parser.error(f"--where: {e}")
+        if selected == 0:
+            print(f"No testcases selected by --where {options.where}", file=sys.stderr)
+            sys.exit(1)
+        testcases = select_testcases(options.where, options.catalog)
     else:
-        plural = "s"
-    print(f"{sum} testcase{plural} FAILED :(")
+        testcases = load_testcases(options.catalog)
+
+    # the number of testcases of the whole run, it is known once all of them have been read
+    totals = []
+    testcases = counted(testcases, totals)
+    if options.shard is not None:
+        print(f"Shard {options.shard[0]}/{options.shard[1]}\n")
+        testcases = shard_testcases(testcases, *options.shard)
+
+    if options.budget is not None:
+        seed = options.seed if options.seed is not None else random.randrange(1 << 32)
+        print(f"Smoke test with a budget of {options.budget:g}s, use --seed {seed} to reproduce it\n")
+        testcases = smoke_testcases(testcases, options.budget, seed, statistics)
+
+    try:
+        schedule = durations if options.schedule == 'longest-first' and options.budget is None else None
+        if (run_testcases(testcases, statistics, options.jobs, options.fail_fast, options.batch_size, schedule,
+                          options.combine and options.budget is None) and totals):
+            for reporter in reporters:
+                reporter.complete(totals[0])
+    except KeyboardInterrupt:
+        close_reporters()
+        print(f"Result: {statistics}")
+        print(f"Interrupted.")
+        sys.exit(130)
+    except sqlite3.Error as e:
+        # the expression of --where has been checked by catalog.count(), this is an error of the database itself
+        print(f"SQLite error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        backend.close()
+        if cache is not None:
+            cache.close()
+        close_reporters()
+        try:
+            durations.save()
+        except OSError as e:
+            print(f"Durations not saved: {e}", file=sys.stderr)
+
+    if options.resources:
+        resources.print_summary()
+    reporting.print_summary(statistics)
+    if statistics['failed'] or statistics['timeouts']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
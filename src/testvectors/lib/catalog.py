@@ -0,0 +1,183 @@
+# MIT License
+#
+# Copyright (c) 2023-2024 Johann N. Loefflmann, https://johann.loefflmann.net
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# A SQLite catalog of all testvectors, written by convert-testvectors-text2json.py.
+# Messages and digests are stored as blobs, and the columns which are useful to select testvectors are indexed,
+# so that a subset can be selected without reading anything else, e.g.
+#   algo LIKE 'skein%' AND msglen < 1024
+
+import json
+import os
+import sqlite3
+
+CATALOG = 'testvectors/catalog.sqlite'
+
+SCHEMA = '''
+CREATE TABLE testvectors (
+    id       TEXT PRIMARY KEY,  -- stable id of the testvector, see testcase_id()
+    algo     TEXT NOT NULL,     -- algorithm as known by Jacksum, and the name of the json file
+    family   TEXT NOT NULL,     -- e.g. sha3, blake or crc
+    mdlen    INTEGER,           -- length of the message digest in bits
+    msglen   INTEGER,           -- length of the message in bits
+    source   TEXT NOT NULL,     -- file the testvector has been read from
+    ordinal  INTEGER NOT NULL,  -- 1-based position of the testvector in the json file
+    position INTEGER NOT NULL,  -- 1-based position of the testvector in its source
+    desc     TEXT NOT NULL,
+    encoding TEXT NOT NULL,     -- hex or hex-uppercase
+    msg      BLOB,
+    md       BLOB NOT NULL,
+    args     TEXT               -- args as json, NULL means -a <algo> -q hex:<msg> -E <encoding>
+);
+CREATE INDEX testvectors_algo ON testvectors (algo);
+CREATE INDEX testvectors_family ON testvectors (family);
+CREATE INDEX testvectors_mdlen ON testvectors (mdlen);
+CREATE INDEX testvectors_msglen ON testvectors (msglen);
+CREATE INDEX testvectors_source ON testvectors (source);
+'''
+
+COLUMNS = ('id', 'algo', 'family', 'mdlen', 'msglen', 'source', 'ordinal', 'position', 'desc', 'encoding', 'msg', 'md',
+           'args')
+
+
+def create(filename):
+    """Creates an empty catalog, an existing catalog is replaced."""
+    if os.path.exists(filename):
+        os.remove(filename)
+    connection = sqlite3.connect(filename)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def insert(connection, rows):
+    """Inserts rows, which are dicts with the keys in COLUMNS."""
+    placeholders = ', '.join('?' * len(COLUMNS))
+    connection.executemany(f"INSERT INTO testvectors ({', '.join(COLUMNS)}) VALUES ({placeholders})",
+                           ([row[column] for column in COLUMNS] for row in rows))
+
+
+def copy(connection, filename, algo):
+    """Copies the rows of algo from the catalog filename, in their order."""
+    connection.execute("ATTACH DATABASE ? AS previous", (filename,))
+    try:
+        connection.execute("INSERT INTO testvectors SELECT * FROM previous.testvectors WHERE algo = ? ORDER BY rowid",
+                           (algo,))
+        connection.commit()
+    finally:
+        connection.execute("DETACH DATABASE previous")
+
+
+def testcase_id(algo, source, position):
+    """Returns the stable id of a testvector: <algo>/<source>#<position> for a testvector converted from a raw file,
+    e.g. sha3-224/SHA3_224LongMsg.rsp#3, and <algo>#<position> if the json file of algo is the source itself,
+    e.g. crc64-jones#1. The position counts in the source only, so the id doesn't change if testvectors are added
+    to or removed from other sources."""
+    if source == f"{algo}.json":
+        return f"{algo}#{position}"
+    return f"{algo}/{source}#{position}"
+
+
+def row(algo, family, source, ordinal, position, desc, args, expected):
+    """Returns the catalog row of a testcase in the json representation."""
+    encoding = args[args.index('-E') + 1] if '-E' in args else 'hex'
+    msg = None
+    if '-q' in args:
+        kind, _, value = args[args.index('-q') + 1].partition(':')
+        if kind == 'hex':
+            msg = bytes.fromhex(value)
+        elif kind == 'txt':
+            msg = value.encode('utf-8')
+    standard = (len(args) == 6 and args[0] == '-a' and args[2] == '-q' and args[3].startswith('hex:')
+                and args[4] == '-E')
+    return {
+        'id': testcase_id(algo, source, position),
+        'algo': algo,
+        'family': family,
+        'mdlen': len(expected) * 4,
+        'msglen': None if msg is None else len(msg) * 8,
+        'source': source,
+        'ordinal': ordinal,
+        'position': position,
+        'desc': desc,
+        'encoding': encoding,
+        'msg': msg,
+        'md': bytes.fromhex(expected),
+        'args': None if standard else json.dumps(args)
+    }
+
+
+def _connect(filename):
+    if not os.path.exists(filename):
+        raise FileNotFoundError(f"{filename} not found, run convert-testvectors-text2json.py to create it")
+    return sqlite3.connect(f"file:{filename}?mode=ro", uri=True)
+
+
+def _condition(where, algos):
+    """Returns the SQL expression where restricted to algos, if algos is given, and its parameters."""
+    if algos is None:
+        return where, []
+    params = list(algos)
+    return f"algo IN ({', '.join('?' * len(params))}) AND ({where})", params
+
+
+def count(filename, where='1', algos=None):
+    """Returns the number of testvectors matching the SQL expression where, see select()."""
+    where, params = _condition(where, algos)
+    connection = _connect(filename)
+    try:
+        return connection.execute(f"SELECT COUNT(*) FROM testvectors WHERE {where}", params).fetchone()[0]
+    finally:
+        connection.close()
+
+
+def select(filename, where='1', algos=None):
+    """Yields the testvectors matching the SQL expression where, in the order of the json files,
+    as tuples (algo, ordinal, source, position, desc, args, expected). If algos is given, only testvectors of
+    those algos are selected."""
+    where, params = _condition(where, algos)
+    connection = _connect(filename)
+    try:
+        cursor = connection.execute(f"SELECT algo, ordinal, source, position, desc, encoding, msg, md, args "
+                                    f"FROM testvectors WHERE {where} ORDER BY rowid", params)
+        for algo, ordinal, source, position, desc, encoding, msg, md, args in cursor:
+            expected = md.hex().upper() if encoding == 'hex-uppercase' else md.hex()
+            if args is None:
+                args = ["-a", algo, "-q", f"hex:{msg.hex()}", "-E", encoding]
+            else:
+                args = json.loads(args)
+            yield algo, ordinal, source, position, desc, args, expected
+    finally:
+        connection.close()
+
+
+def segments(filename):
+    """Returns the sources of the testvectors of every json file, in the order of the json file:
+    {algo: [(ordinal of the first testvector, source, number of testvectors), ...]}."""
+    connection = _connect(filename)
+    try:
+        result = {}
+        for algo, first, source, count in connection.execute(
+                "SELECT algo, MIN(ordinal), source, COUNT(*) FROM testvectors GROUP BY algo, source "
+                "ORDER BY algo, MIN(ordinal)"):
+            result.setdefault(algo, []).append((first, source, count))
+        return result
+    finally:
+        connection.close()
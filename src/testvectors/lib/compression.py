@@ -0,0 +1,108 @@
+# MIT License
+#
+# Copyright (c) 2024 Johann N. Loefflmann, https://johann.loefflmann.net
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Testvector files can be stored compressed by gzip, bzip2 or xz, e.g. testvectors/json/sha3-224.json.xz.
+# Files are written in the format given by their extension, and read in the format given by their magic bytes,
+# so that a file is read correctly even if it has been renamed.
+
+import bz2
+import gzip
+import lzma
+import os
+
+# codec -> (extension, open function)
+CODECS = {
+    'gzip': ('.gz', gzip.open),
+    'bz2': ('.bz2', bz2.open),
+    'xz': ('.xz', lzma.open)
+}
+
+# magic bytes -> codec
+MAGIC = {
+    b'\x1f\x8b': 'gzip',
+    b'BZh': 'bz2',
+    b'\xfd7zXZ\x00': 'xz'
+}
+
+# files whose raw input is larger than this are compressed by xz if the codec is auto, smaller ones by gzip
+AUTO_XZ_THRESHOLD = 1 << 20
+
+
+def choose(codec, size):
+    """Returns the codec for a file with a raw input of size bytes, which is codec itself unless codec is auto."""
+    if codec == 'auto':
+        return 'xz' if size > AUTO_XZ_THRESHOLD else 'gzip'
+    return codec
+
+
+def filename(name, codec):
+    """Returns the name of the file name compressed by codec, codec none returns name itself."""
+    if codec == 'none':
+        return name
+    extension, _ = CODECS[codec]
+    return name + extension
+
+
+def variants(name):
+    """Returns the names of the file name in all formats, the uncompressed one first."""
+    return [name] + [name + extension for extension, _ in CODECS.values()]
+
+
+def find(name):
+    """Returns the name of the existing file name in any format, or name itself if there is none."""
+    for variant in variants(name):
+        if os.path.exists(variant):
+            return variant
+    return name
+
+
+def basename(name):
+    """Returns the name of a file without the extension of its compression format."""
+    for extension, _ in CODECS.values():
+        if name.endswith(extension):
+            return name[:-len(extension)]
+    return name
+
+
+def detect(name):
+    """Returns the codec of a file given by its magic bytes, or None if it isn't compressed."""
+    with open(name, 'rb') as file:
+        header = file.read(max(len(magic) for magic in MAGIC))
+    for magic, codec in MAGIC.items():
+        if header.startswith(magic):
+            return codec
+    return None
+
+
+def open_text(name, mode='r'):
+    """Opens a text file in utf-8 for reading or writing. A file is written in the format given by its extension,
+    and it is read in the format given by its magic bytes, or as plain text if there are none."""
+    if 'w' in mode:
+        for extension, open_function in CODECS.values():
+            if name.endswith(extension):
+                return open_function(name, 'wt', encoding='utf-8')
+        return open(name, 'w', encoding='utf-8')
+    codec = detect(name)
+    if codec is not None:
+        _, open_function = CODECS[codec]
+        return open_function(name, 'rt', encoding='utf-8')
+    return open(name, 'r', encoding='utf-8')
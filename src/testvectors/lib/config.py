@@ -0,0 +1,67 @@
+# MIT License
+#
+# Copyright (c) 2023-2024 Johann N. Loefflmann, https://johann.loefflmann.net
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# The configuration of the scripts: the jar and the JVM by which Jacksum is called, and the algorithms which are tested.
+
+# user init
+# APP = ["java", "-jar", "jacksum-3.7.0.jar"]
+APP = ["java", "-jar", "jacksum-3.8.0-SNAPSHOT.jar"]
+APP = ["java", "-jar", "/Users/Johann/IdeaProjects/jacksum/target/jacksum-3.8.0-SNAPSHOT.jar"]
+
+TEST_ALGOS = [
+    # SHA3 family
+    'sha3-224','sha3-256', 'sha3-384', 'sha3-512',
+
+    # All 3rd round candidates of the NIST SHA-3 competition
+    'blake-224',     'blake-256',      'blake-384',     'blake-512',
+    'groestl-224',   'groestl-256',   'groestl-384',   'groestl-512',
+    'jh-224',        'jh-256',        'jh-384',        'jh-512',
+    'keccak-224',    'keccak-256',    'keccak-384',    'keccak-512',
+    'skein-512-224', 'skein-512-256', 'skein-512-384', 'skein-512-512',
+
+    # 2nd round candidates of the NIST SHA-3 competition
+    'echo-224',      'echo-256',      'echo-384',      'echo-512',
+    'fugue-224',     'fugue-256',     'fugue-384',     'fugue-512',
+    'luffa-224',     'luffa-256',     'luffa-384',     'luffa-512',
+    'bluemidnightwish-224', 'bluemidnightwish-256', 'bluemidnightwish-384', 'bluemidnightwish-512',
+    'simd-224',      'simd-256',      'simd-384',      'simd-512',
+    'cubehash-224',  'cubehash-256',  'cubehash-384',  'cubehash-512',
+    'hamsi-224',     'hamsi-256',     'hamsi-384',     'hamsi-512',
+    'shabal-224',    'shabal-256',    'shabal-384',    'shabal-512',
+   #'shavite-224',   'shavite-256',   'shavite-384',   'shavite-512',
+
+    # NIST lightweight cryptography competition 2023: finalists ###
+    'ascon-hash', 'ascon-hasha', 'ascon-xof', 'ascon-xofa',
+    'romulus-h',
+
+    # derived from
+    # https://reveng.sourceforge.io/crc-catalogue/all.htm
+    'crc-catalogue',
+
+    # CRC64/JONES by Professor David T. Jones at University College London, see also
+    # http://www0.cs.ucl.ac.uk/staff/d.jones/crcnote.pdf
+    # http://bioinf.cs.ucl.ac.uk/downloads/crc64/crc64.c
+    'crc64-jones'
+]
+
+# testvectors which are generated, e.g. by generate-crc-testvectors.py, they are tested if they exist
+GENERATED_ALGOS = ['crc-generated']
@@ -0,0 +1,182 @@
+# MIT License
+#
+# Copyright (c) 2024 Johann N. Loefflmann, https://johann.loefflmann.net
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# A generic CRC engine for the parameterized CRC models of the CRC catalogue
+# https://reveng.sourceforge.io/crc-catalogue/all.htm, e.g.
+#   width=16  poly=0x1021  init=0xffff  refin=false  refout=false  xorout=0x0000  check=0x29b1  residue=0x0000
+# A model is computed by a table per byte, which works for any width (also for CRC-82/DARC), and by a reference
+# that computes bit by bit, which is used to check the table, the check value and the residue of the model.
+
+import re
+
+MODEL_PATTERN = re.compile(r'''
+    width=(?P<width>\d+)\s+
+    poly=0x(?P<poly>[0-9a-f]+)\s+
+    init=0x(?P<init>[0-9a-f]+)\s+
+    refin=(?P<refin>true|false)\s+
+    refout=(?P<refout>true|false)\s+
+    xorout=0x(?P<xorout>[0-9a-f]+)\s+
+    check=0x(?P<check>[0-9a-f]+)\s+
+    residue=0x(?P<residue>[0-9a-f]+)\s+
+    name="(?P<name>[^"]+)"
+''', re.VERBOSE | re.IGNORECASE)
+
+# the message of the check value
+CHECK_MESSAGE = b'123456789'
+
+
+def reflect(value, width):
+    """Returns the lowest width bits of value in reverse order."""
+    return int(f"{value:0{width}b}"[::-1], 2) if width > 0 else 0
+
+
+class Model:
+    """A CRC model of the catalogue."""
+
+    def __init__(self, width, poly, init, refin, refout, xorout, check=None, residue=None, name=None):
+        self.width = width
+        self.poly = poly
+        self.init = init
+        self.refin = refin
+        self.refout = refout
+        self.xorout = xorout
+        self.check = check
+        self.residue = residue
+        self.name = name
+        self.mask = (1 << width) - 1
+        # the register has at least 8 bits, so that a byte can be processed at once even if width is smaller
+        self.shift = max(width, 8) - width
+        self.table = self._table()
+
+    @classmethod
+    def parse(cls, definition):
+        """Parses a definition of the catalogue like width=16 poly=0x1021 ... name="CRC-16/XMODEM"."""
+        match = MODEL_PATTERN.search(definition)
+        if match is None:
+            raise ValueError(f"not a CRC definition: {definition}")
+        return cls(int(match['width']), int(match['poly'], 16), int(match['init'], 16),
+                   match['refin'].lower() == 'true', match['refout'].lower() == 'true', int(match['xorout'], 16),
+                   int(match['check'], 16), int(match['residue'], 16), match['name'])
+
+    def _table(self):
+        table = []
+        if self.refin:
+            poly = reflect(self.poly, self.width)
+            for byte in range(256):
+                crc = byte
+                for _ in range(8):
+                    crc = (crc >> 1) ^ poly if crc & 1 else crc >> 1
+                table.append(crc)
+        else:
+            width = self.width + self.shift
+            top = 1 << (width - 1)
+            mask = (1 << width) - 1
+            poly = self.poly << self.shift
+            for byte in range(256):
+                crc = byte << (width - 8)
+                for _ in range(8):
+                    crc = ((crc << 1) ^ poly if crc & top else crc << 1) & mask
+                table.append(crc)
+        return table
+
+    def _start(self):
+        return reflect(self.init, self.width) if self.refin else self.init << self.shift
+
+    def _update(self, register, data):
+        table = self.table
+        if self.refin:
+            for byte in data:
+                register = table[(register ^ byte) & 0xff] ^ (register >> 8)
+        else:
+            width = self.width + self.shift
+            mask = (1 << width) - 1
+            for byte in data:
+                register = table[((register >> (width - 8)) ^ byte) & 0xff] ^ ((register << 8) & mask)
+        return register
+
+    def _finish(self, register):
+        if not self.refin:
+            register >>= self.shift
+        if self.refin != self.refout:
+            register = reflect(register, self.width)
+        return register ^ self.xorout
+
+    def compute(self, data):
+        """Returns the CRC of data."""
+        return self._finish(self._update(self._start(), data))
+
+    def prefixes(self, data):
+        """Returns the CRCs of all prefixes of data, from the empty one to data itself, in a single pass."""
+        table = self.table
+        finish = self._finish
+        register = self._start()
+        crcs = [finish(register)]
+        if self.refin:
+            for byte in data:
+                register = table[(register ^ byte) & 0xff] ^ (register >> 8)
+                crcs.append(finish(register))
+        else:
+            width = self.width + self.shift
+            mask = (1 << width) - 1
+            for byte in data:
+                register = table[((register >> (width - 8)) ^ byte) & 0xff] ^ ((register << 8) & mask)
+                crcs.append(finish(register))
+        return crcs
+
+    def hex(self, crc):
+        """Returns a CRC as hex with the number of bytes that Jacksum prints, e.g. 05a3 for CRC-11."""
+        return f"{crc:0{(self.width + 7) // 8 * 2}x}"
+
+    def bits(self, data):
+        """Returns the bits of data in the order in which they are processed."""
+        return [(byte >> i) & 1 for byte in data for i in (range(8) if self.refin else range(7, -1, -1))]
+
+    def reference(self, bits):
+        """Processes the bits bit by bit and returns the register, which is reflected if refout is set,
+        without the final xor."""
+        register = self.init
+        for bit in bits:
+            feedback = ((register >> (self.width - 1)) & 1) ^ bit
+            register = (register << 1) & self.mask
+            if feedback:
+                register ^= self.poly
+        return reflect(register, self.width) if self.refout else register
+
+    def verify(self, samples=()):
+        """Checks the table against the reference for CHECK_MESSAGE and the samples, and the reference against the
+        check value and the residue of the catalogue. The residue is the register after a message followed by its
+        CRC, which is sent in the same bit order as the message. Raises a ValueError if anything doesn't match."""
+        for data in (CHECK_MESSAGE,) + tuple(samples):
+            expected = self.reference(self.bits(data)) ^ self.xorout
+            if self.compute(data) != expected:
+                raise ValueError(f"{self.name}: the table and the reference differ for {data.hex()}")
+        if self.check is not None and self.compute(CHECK_MESSAGE) != self.check:
+            raise ValueError(f"{self.name}: check is {self.hex(self.compute(CHECK_MESSAGE))}, "
+                             f"expected {self.hex(self.check)}")
+        if self.residue is not None:
+            crc = self.compute(CHECK_MESSAGE)
+            # the CRC is sent like the register, i.e. its highest bit first unless refout is set
+            crc_bits = [(crc >> i) & 1 for i in (range(self.width) if self.refout else range(self.width - 1, -1, -1))]
+            residue = self.reference(self.bits(CHECK_MESSAGE) + crc_bits)
+            if residue != self.residue:
+                raise ValueError(f"{self.name}: residue is {residue:x}, expected {self.residue:x}")
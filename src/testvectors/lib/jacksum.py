@@ -0,0 +1,323 @@
+# MIT License
+#
+# Copyright (c) 2023-2024 Johann N. Loefflmann, https://johann.loefflmann.net
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Calls Jacksum, either by a new JVM per call (SubprocessBackend) or by a pool of long-lived JVMs which have loaded
+# Jacksum once (DaemonBackend, see daemon/JacksumDaemon.java). The execute() of a backend returns stdout, stderr,
+# the exit status and the Usage of the call, and raises subprocess.TimeoutExpired if Jacksum did not finish in time.
+
+import collections
+import os
+import queue
+import re
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+# time for calls which prepare or calibrate the JVM, e.g. the one that determines the JDK
+CALIBRATION_TIMEOUT = 60
+
+# a daemon is replaced after this number of calls
+DAEMON_MAX_REQUESTS = 1000
+# time for a daemon to start and to answer the first ping
+DAEMON_STARTUP_TIMEOUT = 30
+# JDKs which can run the daemon, see daemon_command()
+DAEMON_MIN_JDK = 11
+DAEMON_MAX_JDK = 23
+
+# messages are written to a tmpfs if there is one, otherwise to the default temporary directory
+MESSAGE_DIR = '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else None
+
+# processes which are currently running, so that they can be killed on Ctrl-C or fail-fast
+running = set()
+running_lock = threading.Lock()
+cancelled = threading.Event()
+
+
+def kill_all():
+    """Kills all processes that are running, and every process that is started until cancelled is cleared."""
+    cancelled.set()
+    with running_lock:
+        for process in running:
+            process.kill()
+
+
+def decode(output):
+    """Decodes the output of a process like universal_newlines does."""
+    return output.decode('utf-8', errors='replace').replace('\r\n', '\n').replace('\r', '\n')
+
+
+# resource usage of a call of Jacksum: wall time, user and sys CPU time in seconds and the peak RSS in KiB,
+# the values which are unknown are None
+Usage = collections.namedtuple('Usage', ['wall', 'user', 'sys', 'maxrss'])
+
+
+class MeasuredPopen(subprocess.Popen):
+    """A Popen which waits for the process by os.wait4() where available, and keeps its resource usage."""
+
+    rusage = None
+
+    def _try_wait(self, wait_flags):
+        if not hasattr(os, 'wait4'):
+            return super()._try_wait(wait_flags)
+        try:
+            pid, sts, rusage = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            return self.pid, 0
+        if pid == self.pid:
+            self.rusage = rusage
+        return pid, sts
+
+    def usage(self, wall):
+        if self.rusage is None:
+            return Usage(wall, None, None, None)
+        # ru_maxrss is in bytes on macOS and in KiB elsewhere
+        maxrss = self.rusage.ru_maxrss // 1024 if sys.platform == 'darwin' else self.rusage.ru_maxrss
+        return Usage(wall, self.rusage.ru_utime, self.rusage.ru_stime, maxrss)
+
+
+class SubprocessBackend:
+    """Starts a new JVM for every call of Jacksum, app is the command that calls the jar,
+    e.g. ["java", "-jar", "jacksum.jar"]."""
+
+    # the backend can pass input bytes to the stdin of Jacksum
+    accepts_input = True
+
+    def __init__(self, app):
+        self.app = app
+
+    def execute(self, args, timeout, input=None):
+        start = time.monotonic()
+        process = MeasuredPopen(self.app + list(args),
+                                stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        with running_lock:
+            running.add(process)
+        try:
+            if cancelled.is_set():
+                process.kill()
+            stdout, stderr = process.communicate(input=input, timeout=timeout)
+            return decode(stdout), decode(stderr), process.returncode, process.usage(time.monotonic() - start)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+        finally:
+            with running_lock:
+                running.discard(process)
+
+    def close(self):
+        pass
+
+
+class DaemonError(Exception):
+    pass
+
+
+class Daemon:
+    """A long-lived JVM which has loaded Jacksum once and performs the calls it receives on stdin,
+    see daemon/JacksumDaemon.java for the protocol."""
+
+    PING = -1
+
+    def __init__(self, command):
+        self.process = subprocess.Popen(command,
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL)
+        self.requests = 0
+
+    def _read(self, size):
+        data = self.process.stdout.read(size)
+        if len(data) < size:
+            raise DaemonError("daemon has terminated unexpectedly")
+        return data
+
+    def _read_int(self):
+        return struct.unpack('>i', self._read(4))[0]
+
+    def _request(self, frame, timeout):
+        # the daemon is killed if it doesn't respond in time, this lets the blocking read fail
+        expired = threading.Event()
+
+        def expire():
+            expired.set()
+            self.process.kill()
+
+        timer = threading.Timer(timeout, expire)
+        timer.start()
+        with running_lock:
+            running.add(self.process)
+        try:
+            self.process.stdin.write(frame)
+            self.process.stdin.flush()
+            status = self._read_int()
+            stdout = self._read(self._read_int())
+            stderr = self._read(self._read_int())
+            return stdout, stderr, status
+        except (OSError, DaemonError):
+            if expired.is_set():
+                raise subprocess.TimeoutExpired(self.process.args, timeout)
+            raise DaemonError("daemon has terminated unexpectedly")
+        finally:
+            timer.cancel()
+            with running_lock:
+                running.discard(self.process)
+
+    def ping(self, timeout=DAEMON_STARTUP_TIMEOUT):
+        """Returns True if the daemon is alive and responds."""
+        try:
+            self._request(struct.pack('>i', self.PING), timeout)
+            return True
+        except (subprocess.TimeoutExpired, DaemonError):
+            return False
+
+    def execute(self, args, timeout):
+        frame = [struct.pack('>i', len(args))]
+        for arg in args:
+            encoded = arg.encode('utf-8')
+            frame.append(struct.pack('>i', len(encoded)))
+            frame.append(encoded)
+        self.requests += 1
+        start = time.monotonic()
+        stdout, stderr, status = self._request(b''.join(frame), timeout)
+        # the daemon performs many calls, so only the wall time can be attributed to a call
+        usage = Usage(time.monotonic() - start, None, None, None)
+        return decode(stdout), decode(stderr), status, usage
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+
+class DaemonBackend:
+    """Performs the calls of Jacksum by a pool of daemons. A daemon is started on demand, it is replaced
+    after max_requests calls to contain memory leaks, and if it doesn't respond anymore.
+    If no daemon can be started, all calls are performed by the fallback backend, e.g. a SubprocessBackend."""
+
+    # the protocol of the daemon has no stdin
+    accepts_input = False
+
+    def __init__(self, command, fallback, max_requests=DAEMON_MAX_REQUESTS):
+        self.command = command
+        self.max_requests = max_requests
+        self.fallback = fallback
+        self.idle = queue.SimpleQueue()
+        self.daemons = set()
+        self.lock = threading.Lock()
+        self.broken = False
+
+    def _acquire(self):
+        while True:
+            try:
+                daemon = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            if daemon.process.poll() is None:
+                return daemon
+            self._discard(daemon)
+
+        try:
+            daemon = Daemon(self.command)
+        except OSError as e:
+            raise DaemonError(f"daemon {self.command} could not be started: {e}")
+        with self.lock:
+            self.daemons.add(daemon)
+        if not daemon.ping():
+            self._discard(daemon)
+            raise DaemonError(f"daemon {self.command} could not be started")
+        return daemon
+
+    def _release(self, daemon):
+        if daemon.requests >= self.max_requests:
+            self._discard(daemon)
+        else:
+            self.idle.put(daemon)
+
+    def _discard(self, daemon):
+        with self.lock:
+            self.daemons.discard(daemon)
+        daemon.close()
+
+    def execute(self, args, timeout):
+        if not self.broken:
+            try:
+                daemon = self._acquire()
+            except DaemonError as e:
+                with self.lock:
+                    if not self.broken:
+                        print(f"{e}, falling back to a JVM per call", file=sys.stderr)
+                    self.broken = True
+            else:
+                try:
+                    result = daemon.execute(args, timeout)
+                except subprocess.TimeoutExpired:
+                    self._discard(daemon)
+                    raise
+                except DaemonError:
+                    # the daemon has crashed, the call is repeated by the fallback backend
+                    self._discard(daemon)
+                else:
+                    self._release(daemon)
+                    return result
+        return self.fallback.execute(args, timeout)
+
+    def close(self):
+        with self.lock:
+            daemons = list(self.daemons)
+            self.daemons.clear()
+        for daemon in daemons:
+            daemon.close()
+
+
+def java_version(app):
+    """Returns the feature version of the JDK of app, e.g. 21, or None if it can't be determined."""
+    try:
+        output = subprocess.run(app[:-2] + ["-version"], stdin=subprocess.DEVNULL, capture_output=True,
+                                universal_newlines=True, timeout=CALIBRATION_TIMEOUT).stderr
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r'version "(\d+)(?:\.(\d+))?', output)
+    if match is None:
+        return None
+    # up to JDK 8 the version is 1.<feature>
+    return int(match.group(2) or 0) if match.group(1) == '1' else int(match.group(1))
+
+
+def daemon_command(app):
+    """Returns the command that starts a daemon for the jar of app.
+    The daemon traps System.exit() of Jacksum by a security manager: JDK 12 to 23 allow it by
+    -Djava.security.manager=allow, JDK 11 allows it without that option (which it would take as a class name),
+    and JDK 24 and later can't install a security manager anymore (JEP 486).
+    Raises a DaemonError if the JDK is not supported."""
+    jar = app[-1]
+    version = java_version(app)
+    if version is not None and not DAEMON_MIN_JDK <= version <= DAEMON_MAX_JDK:
+        raise DaemonError(f"the daemon requires JDK {DAEMON_MIN_JDK} to {DAEMON_MAX_JDK}, but JDK {version} is used")
+    options = [] if version is not None and version < 12 else ["-Djava.security.manager=allow"]
+    return app[:-2] + options + ["-cp", jar, "daemon/JacksumDaemon.java", jar]
@@ -0,0 +1,284 @@
+# MIT License
+#
+# Copyright (c) 2023-2024 Johann N. Loefflmann, https://johann.loefflmann.net
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Loads testcases lazily, so that the first testcase can be performed as soon as it has been read,
+# and keeps them in compact records. Single testcases of a json file are read at their offsets, which are kept
+# in an index next to the json file, e.g. testvectors/json/sha3-224.json.idx.
+
+import io
+import json
+import os
+import struct
+import sys
+
+from testvectors.lib import catalog
+from testvectors.lib import compression
+
+# the size of the chunks in which json files are read
+CHUNK_SIZE = 1 << 16
+
+# the index of a json file: a header with the size and mtime of the json file, and the offsets of its elements
+INDEX_EXTENSION = '.idx'
+INDEX_MAGIC = b'JTCIDX01'
+INDEX_HEADER = struct.Struct('<8sQQ')
+INDEX_OFFSET = struct.Struct('<Q')
+
+# args which are longer than this are unique (e.g. messages) and not worth to be interned
+MAX_INTERNED_ARG_LENGTH = 64
+
+
+class Testcase:
+    """A testcase read from one of the sources in testvectors/.
+    source is the name of the source (e.g. "hmac" or "sha3-224"), and ordinal is the 1-based position
+    of the testcase in that source. origin is the raw file the testcase has been converted from and its 1-based
+    position in that file, if it is known, see catalog.segments(). number is the position of the testcase in a run
+    if it isn't given by the order in which the testcases are performed, e.g. in a shard of a run."""
+
+    __slots__ = ('source', 'ordinal', 'origin', 'desc', 'args', 'expected', 'number')
+
+    def __init__(self, source, ordinal, desc, args, expected, origin=None):
+        self.source = source
+        self.ordinal = ordinal
+        self.origin = origin
+        self.desc = desc
+        self.args = args
+        self.expected = expected
+        self.number = None
+
+    @classmethod
+    def from_dict(cls, testcase, source, ordinal, origin=None):
+        """Creates a Testcase from its json representation. The args are stored as a tuple, and frequent
+        args such as "-a", algorithm names and encodings are interned, so that they are shared by all testcases."""
+        args = tuple(sys.intern(arg) if len(arg) <= MAX_INTERNED_ARG_LENGTH else arg for arg in testcase['args'])
+        return cls(source, ordinal, testcase['desc'], args, testcase['expected'], origin)
+
+    def message_length(self):
+        """Returns the length in bytes of the message given by -q, or 0 if there is none."""
+        try:
+            kind, _, value = self.args[self.args.index('-q') + 1].partition(':')
+        except (ValueError, IndexError):
+            return 0
+        if kind == 'hex':
+            return len(value) // 2
+        if kind == 'txt':
+            return len(value.encode('utf-8'))
+        return 0
+
+    @property
+    def id(self):
+        """Returns the id of the testcase, e.g. sha3-224/SHA3_224ShortMsg.rsp#17 or hmac#3, which doesn't change if
+        other sources change, see catalog.testcase_id(). If the origin is unknown, the ordinal is taken instead."""
+        if self.origin is None:
+            return f"{self.source}#{self.ordinal}"
+        return catalog.testcase_id(self.source, *self.origin)
+
+    def __repr__(self):
+        return f"Testcase({self.id}: {self.desc})"
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE, offsets=False):
+    """Yields the elements of the json array in file one by one, without reading the whole file.
+    With offsets, tuples (byte offset of the element, element) are yielded, the file has to be read in utf-8
+    without translating newlines then."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size)
+    pos = 0
+    eof = False
+    # the byte offset of buffer[mark]
+    mark = 0
+    mark_offset = 0
+
+    def skip(pos, chars):
+        while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] in chars):
+            pos += 1
+        return pos
+
+    def offset(pos):
+        nonlocal mark, mark_offset
+        mark_offset += len(buffer[mark:pos].encode('utf-8'))
+        mark = pos
+        return mark_offset
+
+    pos = skip(pos, '')
+    if not buffer.startswith('[', pos):
+        raise ValueError(f"{getattr(file, 'name', 'file')}: a json array was expected")
+    pos += 1
+
+    while True:
+        pos = skip(pos, ',')
+        if pos < len(buffer) and buffer[pos] == ']':
+            return
+        try:
+            if pos == len(buffer):
+                raise json.JSONDecodeError("Unexpected end of data", buffer, pos)
+            start = pos
+            element, pos = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # the element is incomplete, read more data if there is more
+            if eof:
+                raise
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            if offsets:
+                offset(pos)
+                mark = 0
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield (offset(start), element) if offsets else element
+
+
+def index_filename(filename):
+    """Returns the name of the index of a json file, e.g. testvectors/json/sha3-224.json.idx."""
+    return filename + INDEX_EXTENSION
+
+
+# the indexes which could not be written, by the name of the json file: its size, mtime and the offsets
+unwritten_indexes = {}
+
+
+def write_index(filename):
+    """Writes the index of a json file and returns the offsets of its elements. If the index can't be written,
+    e.g. because the directory is read-only, the offsets are kept in memory instead."""
+    stat = os.stat(filename)
+    with open(filename, 'rb') as raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as file:
+        offsets = [offset for offset, _ in iter_json_array(file, offsets=True)]
+    try:
+        with open(f"{index_filename(filename)}.tmp", 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, stat.st_size, stat.st_mtime_ns))
+            f.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+        os.replace(f"{index_filename(filename)}.tmp", index_filename(filename))
+    except OSError:
+        try:
+            os.remove(f"{index_filename(filename)}.tmp")
+        except OSError:
+            pass
+        unwritten_indexes[filename] = stat.st_size, stat.st_mtime_ns, offsets
+    return offsets
+
+
+def element_offset(filename, ordinal):
+    """Returns the byte offset of the element ordinal (1-based) of a json file, or None if there is none.
+    The offset is read from the index, which is written first if it doesn't exist or if the file has changed."""
+    stat = os.stat(filename)
+    size, mtime_ns, offsets = unwritten_indexes.get(filename, (None, None, None))
+    if (size, mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+        return offsets[ordinal - 1] if 1 <= ordinal <= len(offsets) else None
+    try:
+        with open(index_filename(filename), 'rb') as f:
+            magic, size, mtime_ns = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+            if (magic, size, mtime_ns) == (INDEX_MAGIC, stat.st_size, stat.st_mtime_ns):
+                if ordinal < 1:
+                    return None
+                f.seek(INDEX_HEADER.size + (ordinal - 1) * INDEX_OFFSET.size)
+                entry = f.read(INDEX_OFFSET.size)
+                return INDEX_OFFSET.unpack(entry)[0] if len(entry) == INDEX_OFFSET.size else None
+    except (OSError, struct.error):
+        pass
+    offsets = write_index(filename)
+    return offsets[ordinal - 1] if 1 <= ordinal <= len(offsets) else None
+
+
+def read_element(filename, offset, chunk_size=CHUNK_SIZE):
+    """Reads the json element at the byte offset of a json file."""
+    decoder = json.JSONDecoder()
+    with open(filename, 'rb') as raw:
+        raw.seek(offset)
+        with io.TextIOWrapper(raw, encoding='utf-8', newline='') as file:
+            buffer = ''
+            while True:
+                chunk = file.read(chunk_size)
+                buffer += chunk
+                try:
+                    return decoder.raw_decode(buffer)[0]
+                except json.JSONDecodeError:
+                    if not chunk:
+                        raise
+
+
+def origin(segments, ordinal):
+    """Returns the raw file and the position in that file of the testcase ordinal of a json file with the given
+    segments (see catalog.segments()), or None if it isn't covered by the segments."""
+    for first, source, count in segments or ():
+        if first <= ordinal < first + count:
+            return source, ordinal - first + 1
+    return None
+
+
+def read_json(filename, source, segments=None):
+    """Yields the testcases stored in the json file as Testcase objects, the json file may be compressed.
+    segments are the raw files of the json file, see catalog.segments()."""
+    with compression.open_text(filename) as file:
+        for ordinal, testcase in enumerate(iter_json_array(file), 1):
+            yield Testcase.from_dict(testcase, source, ordinal, origin(segments, ordinal))
+
+
+def read_json_at(filename, source, ordinals, segments=None):
+    """Yields the testcases with the given ordinals of a json file as Testcase objects. The testcases of a plain
+    json file are read at their offsets, see element_offset(), a compressed json file is read up to the last one.
+    Raises a ValueError if there is no testcase with one of the ordinals."""
+    ordinals = sorted(set(ordinals))
+    if compression.detect(filename) is None:
+        for ordinal in ordinals:
+            offset = element_offset(filename, ordinal)
+            if offset is None:
+                raise ValueError(f"{filename}: there is no testcase #{ordinal}")
+            yield Testcase.from_dict(read_element(filename, offset), source, ordinal, origin(segments, ordinal))
+        return
+    wanted = set(ordinals)
+    for testcase in read_json(filename, source, segments):
+        if testcase.ordinal in wanted:
+            wanted.discard(testcase.ordinal)
+            yield testcase
+            if not wanted:
+                return
+    raise ValueError(f"{filename}: there is no testcase #{min(wanted)}")
+
+
+def from_dicts(testcases, source):
+    """Yields the testcases given as dicts (e.g. by general_testcases.get()) as Testcase objects."""
+    for ordinal, testcase in enumerate(testcases, 1):
+        yield Testcase.from_dict(testcase, source, ordinal)
+
+
+def read_catalog(filename, where, algos=None):
+    """Yields the testcases in the catalog which match the SQL expression where as Testcase objects."""
+    for algo, ordinal, source, position, desc, args, expected in catalog.select(filename, where, algos):
+        yield Testcase.from_dict({'desc': desc, 'args': args, 'expected': expected}, algo, ordinal,
+                                 (source, position))
+
+
+def algorithm(testcase):
+    """Returns the algorithm given by -a as the first arg of the testcase, or None."""
+    return testcase.args[1] if testcase.args[:1] == ('-a',) and len(testcase.args) > 1 else None
+
+
+def batch_key(testcase):
+    """Returns the algorithm and the encoding if the testcase can be batched with others, otherwise None.
+    Only testcases of the form -a <algo> -q hex:<msg> -E <encoding> [-F #CHECKSUM] with a single line as expected
+    value can be batched."""
+    args = testcase.args
+    if (len(args) in (6, 8) and args[0] == '-a' and args[2] == '-q' and args[3].startswith('hex:')
+            and len(args[3]) % 2 == 0 and args[4] == '-E' and args[6:] in ((), ('-F', '#CHECKSUM'))
+            and '\n' not in testcase.expected):
+        return args[1], args[5]
+    return None
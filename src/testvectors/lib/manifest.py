@@ -0,0 +1,107 @@
+# MIT License
+#
+# Copyright (c) 2024 Johann N. Loefflmann, https://johann.loefflmann.net
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# The manifest of convert-testvectors-text2json.py. It records the digests of the files that have been read
+# and written by a conversion, so that the next conversion rebuilds only the outputs whose inputs have changed:
+#   {
+#     "version": <digest of the converter>,
+#     "files":   {<path>: {"size": ..., "mtime_ns": ..., "sha256": ...}, ...},
+#     "outputs": {<algo>: {"inputs": {<path>: <sha256>, ...}, "output": <sha256 or null>}, ...},
+#     "catalog": <sha256 of the catalog>
+#   }
+# The size and mtime of a file are used to avoid hashing it again if it hasn't been touched.
+
+import hashlib
+import json
+import os
+
+MANIFEST = 'testvectors/manifest.json'
+
+# the size of the chunks in which files are hashed
+CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path):
+    """Returns the SHA-256 of the content of a file as hex."""
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def version(*paths):
+    """Returns a version stamp of the converter, that is the digest of its source files."""
+    sha256 = hashlib.sha256()
+    for path in paths:
+        sha256.update(file_digest(path).encode('ascii'))
+    return sha256.hexdigest()
+
+
+class Manifest:
+    """The manifest of the previous conversion and the one that is written by the current conversion."""
+
+    def __init__(self, filename=MANIFEST):
+        self.filename = filename
+        try:
+            with open(filename, encoding='utf-8') as f:
+                self.previous = json.load(f)
+        except (OSError, ValueError):
+            self.previous = {}
+        self.files = {}
+
+    def digest(self, path):
+        """Returns the SHA-256 of a file, or None if it doesn't exist. The digest of the previous conversion
+        is reused if the size and mtime of the file haven't changed."""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        entry = self.previous.get('files', {}).get(path)
+        if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_digest(path)}
+        self.files[path] = entry
+        return entry['sha256']
+
+    def output(self, algo, inputs, output):
+        """Returns the record of an output, i.e. the digests of its input files and of the output file."""
+        return {'inputs': {path: self.digest(path) for path in inputs},
+                'output': None if output is None else self.digest(output)}
+
+    def is_up_to_date(self, version, algo, record):
+        """Returns True if the previous conversion has written the output of algo by the same version
+        of the converter from the same inputs, and if the output hasn't been changed since."""
+        return (self.previous.get('version') == version
+                and self.previous.get('outputs', {}).get(algo) == record
+                and None not in record['inputs'].values())
+
+    def write(self, version, outputs, catalog):
+        """Writes the manifest of the current conversion, the previous one is replaced atomically."""
+        manifest = {
+            'version': version,
+            'files': self.files,
+            'outputs': outputs,
+            'catalog': catalog
+        }
+        with open(f"{self.filename}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(f"{self.filename}.tmp", self.filename)
@@ -0,0 +1,273 @@
+# MIT License
+#
+# Copyright (c) 2024 Johann N. Loefflmann, https://johann.loefflmann.net
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# The reporters of run-tests.py. A reporter gets the result of every testcase in the order of the testcases,
+# a result is a dict with the keys id, desc, source, args, verdict, passed, lines and optionally usage and timeout.
+# complete() is called once all testcases of a run (or of a shard) have been reported.
+#   ConsoleReporter    prints every result (verbose) or a progress counter and the failures only (quiet)
+#   JsonLinesReporter  writes a json object per testcase
+#   JUnitReporter      writes a JUnit XML report with a testsuite per source
+# Files are written by a BufferedWriter, so that writing them doesn't hold up the reporting.
+# Long args (e.g. the messages of LongMsg testvectors) are shortened to their start, their length and a digest.
+# print_summary() prints the verdict of a run, also of the shards merged by merge-results.py.
+
+import hashlib
+import json
+import queue
+import re
+import sys
+import threading
+import time
+from xml.sax.saxutils import escape, quoteattr
+
+from testvectors.lib import compression
+
+# args longer than this are shortened
+ARG_MAX_LENGTH = 80
+
+# the progress of the quiet console is updated at most every PROGRESS_INTERVAL seconds on a terminal,
+# and printed every PROGRESS_LOG_INTERVAL seconds otherwise (e.g. in a CI log)
+PROGRESS_INTERVAL = 0.2
+PROGRESS_LOG_INTERVAL = 30
+
+# characters which are not allowed in XML 1.0
+XML_ILLEGAL = re.compile('[^\t\n\r\x20-\ud7ff\ue000-\ufffd\U00010000-\U0010ffff]')
+
+
+def shorten(arg, max_length=ARG_MAX_LENGTH):
+    """Returns arg if it isn't longer than max_length, otherwise its start, its length and the first
+    16 hex digits of its SHA-256, e.g. hex:3a5f...[8194 chars, sha256:0c9e4e6b51d1f0a3]."""
+    if len(arg) <= max_length:
+        return arg
+    digest = hashlib.sha256(arg.encode('utf-8')).hexdigest()[:16]
+    return f"{arg[:max_length // 2]}...[{len(arg)} chars, sha256:{digest}]"
+
+
+def shorten_args(args):
+    return [shorten(arg) for arg in args]
+
+
+def details(counter, result):
+    """Returns the lines of a result as they are printed to the console."""
+    return ''.join([f"Test #{counter} ({result['id']}): {result['desc']}\n", f"Args: {shorten_args(result['args'])}\n"]
+                   + [f"{line}\n" for line in result['lines']])
+
+
+class BufferedWriter:
+    """Writes text to a file by a background thread. write() only queues the text, the thread writes
+    everything that has been queued at once. The file is written in the format given by its extension,
+    e.g. results.jsonl.gz is compressed by gzip."""
+
+    def __init__(self, filename, max_queued=4096):
+        self.file = compression.open_text(filename, 'w')
+        self.queue = queue.Queue(max_queued)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name=f"writer {filename}", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        done = False
+        while not done:
+            chunks = [self.queue.get()]
+            while True:
+                try:
+                    chunks.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in chunks:
+                chunks = chunks[:chunks.index(None)]
+                done = True
+            if self.error is None:
+                try:
+                    self.file.write(''.join(chunks))
+                except OSError as e:
+                    self.error = e
+
+    def write(self, text):
+        if self.error is not None:
+            raise self.error
+        self.queue.put(text)
+
+    def close(self):
+        """Writes all queued text and closes the file."""
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+        if self.error is not None:
+            raise self.error
+
+
+class ConsoleReporter:
+    """Prints the results to stdout. In verbose mode every result is printed, in quiet mode only a progress
+    counter and the details of the testcases that haven't passed."""
+
+    def __init__(self, verbose=True, file=None):
+        self.verbose = verbose
+        self.file = file if file is not None else sys.stdout
+        self.tty = self.file.isatty()
+        self.counts = {'passed': 0, 'failed': 0, 'timeouts': 0}
+        self.counter = 0
+        self.last_progress = 0.0
+        self.start = time.monotonic()
+
+    def progress(self):
+        elapsed = time.monotonic() - self.start
+        return (f"Test #{self.counter}: {self.counts['passed']} passed, {self.counts['failed']} failed, "
+                f"{self.counts['timeouts']} timed out ({elapsed:.0f}s)")
+
+    def report(self, counter, result):
+        self.counter = counter
+        if result['passed']:
+            self.counts['passed'] += 1
+        else:
+            self.counts['timeouts' if result.get('timeout') else 'failed'] += 1
+        if self.verbose:
+            self.file.write(details(counter, result))
+            return
+        now = time.monotonic()
+        if not result['passed']:
+            self.file.write(('\r\033[K' if self.tty else '') + details(counter, result))
+            self.file.flush()
+        elif now - self.last_progress >= (PROGRESS_INTERVAL if self.tty else PROGRESS_LOG_INTERVAL):
+            self.file.write(f"\r\033[K{self.progress()}" if self.tty else f"{self.progress()}\n")
+            self.file.flush()
+            self.last_progress = now
+
+    def complete(self, total):
+        pass
+
+    def close(self):
+        if not self.verbose:
+            self.file.write(f"\r\033[K{self.progress()}\n\n" if self.tty else f"{self.progress()}\n\n")
+        self.file.flush()
+
+
+class JsonLinesReporter:
+    """Writes a json object per testcase, e.g.
+    {"test": 1, "id": "general#1", "source": "general", "desc": "...", "args": [...], "verdict": "PASSED", "passed": true,
+     "wall": 0.31, "user": 0.52, "sys": 0.06, "maxrss": 48212}
+    The lines of the details are written for the testcases that haven't passed only. The file starts with the
+    shard, e.g. {"shard": [2, 4]}, and a run that has performed all its testcases ends with the number of testcases
+    of the whole run, e.g. {"total": 252313}, by which merge-results.py tells if a shard or a testcase is missing."""
+
+    def __init__(self, filename, shard=None):
+        self.writer = BufferedWriter(filename)
+        self.writer.write(json.dumps({'shard': list(shard) if shard is not None else None}) + '\n')
+
+    def report(self, counter, result):
+        record = {
+            'test': counter,
+            'id': result['id'],
+            'source': result['source'],
+            'desc': result['desc'],
+            'args': shorten_args(result['args']),
+            'verdict': result['verdict'],
+            'passed': result['passed']
+        }
+        usage = result.get('usage')
+        if usage is not None:
+            record.update(usage._asdict())
+        if not result['passed']:
+            record['lines'] = result['lines']
+        self.writer.write(json.dumps(record) + '\n')
+
+    def complete(self, total):
+        self.writer.write(json.dumps({'total': total}) + '\n')
+
+    def close(self):
+        self.writer.close()
+
+
+class JUnitReporter:
+    """Writes a JUnit XML report with a testsuite per source. The testcases of a source are kept until
+    the next source starts, so the report is written while the testcases are performed. A testcase which
+    has failed is reported as failure, a testcase which has timed out as error."""
+
+    def __init__(self, filename, name='jacksum-testcases'):
+        self.writer = BufferedWriter(filename)
+        self.writer.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<testsuites name={quoteattr(name)}>\n')
+        self.source = None
+        self.testcases = []
+        self.counts = {'tests': 0, 'failures': 0, 'errors': 0, 'time': 0.0}
+
+    @staticmethod
+    def text(text):
+        return escape(XML_ILLEGAL.sub('?', text))
+
+    def flush(self):
+        if self.source is None:
+            return
+        counts = self.counts
+        self.writer.write(f'  <testsuite name={quoteattr(self.source)} tests="{counts["tests"]}" '
+                          f'failures="{counts["failures"]}" errors="{counts["errors"]}" '
+                          f'time="{counts["time"]:.3f}">\n')
+        self.writer.write(''.join(self.testcases))
+        self.writer.write('  </testsuite>\n')
+        self.testcases = []
+        self.counts = {'tests': 0, 'failures': 0, 'errors': 0, 'time': 0.0}
+
+    def report(self, counter, result):
+        if result['source'] != self.source:
+            self.flush()
+            self.source = result['source']
+        usage = result.get('usage')
+        wall = usage.wall if usage is not None else 0.0
+        self.counts['tests'] += 1
+        self.counts['time'] += wall
+        name = quoteattr(XML_ILLEGAL.sub('?', f"{result['id']} {result['desc']}"))
+        testcase = f'    <testcase classname={quoteattr(result["source"])} name={name} time="{wall:.3f}"'
+        if result['passed']:
+            self.testcases.append(testcase + '/>\n')
+            return
+        kind = 'error' if result.get('timeout') else 'failure'
+        self.counts['errors' if kind == 'error' else 'failures'] += 1
+        text = self.text(f"Args: {shorten_args(result['args'])}\n" + '\n'.join(result['lines']))
+        self.testcases.append(f'{testcase}>\n      <{kind} message={quoteattr(result["verdict"])}>{text}'
+                              f'</{kind}>\n    </testcase>\n')
+
+    def complete(self, total):
+        pass
+
+    def close(self):
+        self.flush()
+        self.writer.write('</testsuites>\n')
+        self.writer.close()
+
+
+def print_summary(statistics, missing=0):
+    """Prints the statistics of a run and whether all testcases have passed, which they haven't if missing
+    testcases have not been performed."""
+    print(f"Result: {statistics}")
+    if len(statistics['failed']) == 0 and len(statistics['timeouts']) == 0 and missing == 0:
+        print(f"ALL PASSED :)\n")
+    for key, verdict in (('failed', 'FAILED'), ('timeouts', 'TIMED OUT')):
+        sum = len(statistics[key])
+        if sum == 0:
+            continue
+        if sum == 1:
+            plural = ""
+        else:
+            plural = "s"
+        print(f"{sum} testcase{plural} {verdict} :(")
+    if missing > 0:
+        print(f"{missing} testcase{'' if missing == 1 else 's'} MISSING :(")